@@ -0,0 +1,63 @@
+"""conversation summaries
+
+Inbox table kept up to date by the chat message sink, backfilled from existing messages.
+Old messages are counted as read.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 19:55:02.114620
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('conversations',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('other_user_id', sa.Integer(), nullable=False),
+    sa.Column('last_message_id', sa.Integer(), nullable=False),
+    sa.Column('last_sender_id', sa.Integer(), nullable=False),
+    sa.Column('last_message_text', sa.String(), nullable=False),
+    sa.Column('last_message_at', sa.DateTime(), nullable=False),
+    sa.Column('unread_count', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['last_message_id'], ['messages.id'], ),
+    sa.ForeignKeyConstraint(['last_sender_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['other_user_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'other_user_id')
+    )
+    op.create_index('ix_conversations_user_recent', 'conversations', ['user_id', 'last_message_id'], unique=False)
+
+    # Latest message per (user, counterpart), seen from both sides of each message
+    op.execute("""
+        INSERT INTO conversations (user_id, other_user_id, last_message_id, last_sender_id,
+                                   last_message_text, last_message_at, unread_count)
+        SELECT pairs.user_id, pairs.other_user_id, messages.id, messages.sender_id,
+               messages.message_text, COALESCE(messages.timestamp, CURRENT_TIMESTAMP), 0
+        FROM (
+            SELECT user_id, other_user_id, MAX(id) AS last_id
+            FROM (
+                SELECT sender_id AS user_id, receiver_id AS other_user_id, id FROM messages
+                UNION ALL
+                SELECT receiver_id AS user_id, sender_id AS other_user_id, id FROM messages
+            ) AS sides
+            WHERE user_id IS NOT NULL AND other_user_id IS NOT NULL
+            GROUP BY user_id, other_user_id
+        ) AS pairs
+        JOIN messages ON messages.id = pairs.last_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_conversations_user_recent', table_name='conversations')
+    op.drop_table('conversations')
@@ -0,0 +1,64 @@
+"""hot query indexes
+
+Composite indexes matching the CRUD query shapes. Each one is checked against the
+planner by `python -m benchmarks.explain_indexes`.
+
+    appointments (hospital_id, status, scheduled_time)   live queue window
+    appointments (hospital_id, scheduled_time)           hospital lists, history, slot check
+    appointments (patient_id, scheduled_time)            patient lists, pending check
+    appointments (doctor_id, scheduled_time)             doctor lists
+    appointments (status, scheduled_time)                pending / uncompleted lists
+    doctors (hospital_id, is_available)                  hospital doctors, availability
+    doctors / patients / admins (user_id)                profile lookups by user
+    patients (hospital_card_id)                          card lookup
+    messages (sender_id, receiver_id, id)                keyset chat history
+    signup_links / password_reset_tokens (created_at)    daily cleanup
+
+On PostgreSQL the indexes are built CONCURRENTLY, so writes are not blocked while they build.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 19:58:41.502310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_appointments_queue_window', 'appointments', ['hospital_id', 'status', 'scheduled_time']),
+    ('ix_appointments_hospital_schedule', 'appointments', ['hospital_id', 'scheduled_time']),
+    ('ix_appointments_patient_schedule', 'appointments', ['patient_id', 'scheduled_time']),
+    ('ix_appointments_doctor_schedule', 'appointments', ['doctor_id', 'scheduled_time']),
+    ('ix_appointments_status_schedule', 'appointments', ['status', 'scheduled_time']),
+    ('ix_doctors_hospital_available', 'doctors', ['hospital_id', 'is_available']),
+    ('ix_doctors_user_id', 'doctors', ['user_id']),
+    ('ix_patients_user_id', 'patients', ['user_id']),
+    ('ix_patients_hospital_card_id', 'patients', ['hospital_card_id']),
+    ('ix_admins_user_id', 'admins', ['user_id']),
+    ('ix_messages_conversation', 'messages', ['sender_id', 'receiver_id', 'id']),
+    ('ix_signup_links_created_at', 'signup_links', ['created_at']),
+    ('ix_password_reset_tokens_created_at', 'password_reset_tokens', ['created_at']),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, if_not_exists=True,
+                            postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,150 @@
+import os
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Optional
+from dotenv import load_dotenv
+from redis import asyncio as aioredis
+
+load_dotenv()
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# "redis" fans queue events out to every worker, "memory" keeps them in-process
+QUEUE_BROADCAST_BACKEND = os.getenv("QUEUE_BROADCAST_BACKEND", "redis")
+
+# Events travel between workers as already-encoded JSON text frames
+Handler = Callable[[int, str], Awaitable[None]]
+
+
+class BroadcastBackend(ABC):
+    """ Publishes queue events per hospital and hands received events to a local handler """
+
+    def __init__(self):
+        self.handler: Optional[Handler] = None
+
+    def attach(self, handler: Handler):
+        """ Register the coroutine that delivers an event to this worker's sockets """
+        self.handler = handler
+
+    @abstractmethod
+    async def subscribe(self, hospital_id: int):
+        ...
+
+    @abstractmethod
+    async def unsubscribe(self, hospital_id: int):
+        ...
+
+    @abstractmethod
+    async def publish(self, hospital_id: int, frame: str):
+        ...
+
+    @abstractmethod
+    async def next_seq(self, hospital_id: int) -> int:
+        ...
+
+    @abstractmethod
+    async def current_seq(self, hospital_id: int) -> int:
+        ...
+
+    async def close(self):
+        pass
+
+
+class MemoryBroker:
+    """ Stands in for the Redis server: channels and sequence counters shared by memory backends """
+
+    def __init__(self):
+        self.channels: dict[int, set["MemoryBroadcastBackend"]] = {}
+        self.sequences: dict[int, int] = {}
+
+
+class MemoryBroadcastBackend(BroadcastBackend):
+    """ In-process backend for tests and single-worker setups.
+    Backends created with the same broker behave like workers sharing one Redis. """
+
+    def __init__(self, broker: Optional[MemoryBroker] = None):
+        super().__init__()
+        self.broker = broker or MemoryBroker()
+
+    async def subscribe(self, hospital_id: int):
+        self.broker.channels.setdefault(hospital_id, set()).add(self)
+
+    async def unsubscribe(self, hospital_id: int):
+        subscribers = self.broker.channels.get(hospital_id)
+        if subscribers is not None:
+            subscribers.discard(self)
+            if not subscribers:
+                del self.broker.channels[hospital_id]
+
+    async def publish(self, hospital_id: int, frame: str):
+        for backend in list(self.broker.channels.get(hospital_id, ())):
+            if backend.handler is not None:
+                await backend.handler(hospital_id, frame)
+
+    async def next_seq(self, hospital_id: int) -> int:
+        self.broker.sequences[hospital_id] = self.broker.sequences.get(hospital_id, 0) + 1
+        return self.broker.sequences[hospital_id]
+
+    async def current_seq(self, hospital_id: int) -> int:
+        return self.broker.sequences.get(hospital_id, 0)
+
+
+class RedisBroadcastBackend(BroadcastBackend):
+    """ Fans queue events out through one Redis channel per hospital.
+    A worker only subscribes to hospitals it currently has sockets for. """
+
+    CHANNEL_PREFIX = "queue:hospital:"
+    SEQ_PREFIX = "queue:seq:"
+
+    def __init__(self, url: str = REDIS_URL):
+        super().__init__()
+        self.redis = aioredis.Redis.from_url(url, decode_responses=True)
+        self.pubsub = self.redis.pubsub()
+        self._reader: Optional[asyncio.Task] = None
+
+    def channel(self, hospital_id: int) -> str:
+        return f"{self.CHANNEL_PREFIX}{hospital_id}"
+
+    async def subscribe(self, hospital_id: int):
+        await self.pubsub.subscribe(self.channel(hospital_id))
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.create_task(self._read())
+
+    async def unsubscribe(self, hospital_id: int):
+        await self.pubsub.unsubscribe(self.channel(hospital_id))
+
+    async def publish(self, hospital_id: int, frame: str):
+        await self.redis.publish(self.channel(hospital_id), frame)
+
+    async def next_seq(self, hospital_id: int) -> int:
+        return await self.redis.incr(f"{self.SEQ_PREFIX}{hospital_id}")
+
+    async def current_seq(self, hospital_id: int) -> int:
+        return int(await self.redis.get(f"{self.SEQ_PREFIX}{hospital_id}") or 0)
+
+    async def _read(self):
+        """ Pump messages from the subscribed channels into the local handler """
+        while self.pubsub.subscribed:
+            try:
+                message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is None or self.handler is None:
+                    continue
+                hospital_id = int(message["channel"][len(self.CHANNEL_PREFIX):])
+                await self.handler(hospital_id, message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error reading queue broadcast from Redis: {e}")
+                await asyncio.sleep(1)
+
+    async def close(self):
+        if self._reader is not None:
+            self._reader.cancel()
+        await self.pubsub.aclose()
+        await self.redis.aclose()
+
+
+def get_broadcast_backend() -> BroadcastBackend:
+    """ Build the backend selected by QUEUE_BROADCAST_BACKEND """
+    if QUEUE_BROADCAST_BACKEND == "memory":
+        return MemoryBroadcastBackend()
+    return RedisBroadcastBackend(REDIS_URL)
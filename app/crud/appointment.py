@@ -1,8 +1,8 @@
 from sqlalchemy import and_
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app import models, schemas
-from app.routers.queue_sys import notify_queue_update
+from app.routers.queue_sys import notify_queue_change, QUEUE_ADDED, QUEUE_UPDATED, QUEUE_REMOVED
 
 """
 create an appointment
@@ -10,6 +10,7 @@ list appointments
 list patient appointment
 get appointment by id
 get appointment by hospital
+get hospital appointment history
 get uncompleted appointment
 cancel an appointment
 check pending appointment
@@ -23,7 +24,7 @@ async def create_appointment(patient_id: int, payload: schemas.AppointmentCreate
     db.commit()
     db.refresh(appointment)
 
-    await notify_queue_update(hospital_id=appointment.hospital_id, db=db)
+    notify_queue_change(appointment.hospital_id, QUEUE_ADDED, appointment.id)
 
 
     return appointment 
@@ -45,6 +46,15 @@ def get_appointment_by_hospital_id(hospital_id: int, skip: int, limit: int, db:
     return db.query(models.Appointment).filter(models.Appointment.hospital_id == hospital_id).order_by(models.Appointment.scheduled_time).offset(skip).limit(limit).all()
 
 
+def get_hospital_appointment_history(hospital_id: int, skip: int, limit: int, db: Session, status: Optional[schemas.AppointmentStatus] = None) -> List[models.Appointment]:
+    query = db.query(models.Appointment).filter(models.Appointment.hospital_id == hospital_id)
+
+    if status:
+        query = query.filter(models.Appointment.status == status)
+
+    return query.order_by(models.Appointment.scheduled_time.desc()).offset(skip).limit(limit).all()
+
+
 def get_appointment_by_doctor_id(doctor_id: int, skip: int, limit: int, db: Session) -> List[models.Appointment]:
     return db.query(models.Appointment).filter(models.Appointment.doctor_id == doctor_id).order_by(models.Appointment.scheduled_time).offset(skip).limit(limit).all()
 
@@ -64,7 +74,7 @@ async def cancel_appointment(appointment_id: int, db: Session):
     db.commit()
     db.refresh(appointment)
 
-    await notify_queue_update(hospital_id=appointment.hospital_id, db=db)
+    notify_queue_change(appointment.hospital_id, QUEUE_UPDATED, appointment.id)
 
 
     return appointment
@@ -95,7 +105,7 @@ async def switch_appointment_status(appointment_id: int, new_status: schemas.App
     db.commit()
     db.refresh(appointment)
 
-    await notify_queue_update(hospital_id=appointment.hospital_id, db=db)
+    notify_queue_change(appointment.hospital_id, QUEUE_UPDATED, appointment.id)
 
 
     return appointment
@@ -110,6 +120,6 @@ async def delete_appointment(appointment_id: int, db: Session):
     db.delete(appointment)
     db.commit()
 
-    await notify_queue_update(hospital_id=appointment.hospital_id, db=db)
+    notify_queue_change(appointment.hospital_id, QUEUE_REMOVED, appointment.id)
 
     return True
\ No newline at end of file
@@ -0,0 +1,129 @@
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List, Optional
+from app import models, schemas
+from app.routers.queue_sys import notify_queue_change, QUEUE_ADDED, QUEUE_UPDATED, QUEUE_REMOVED
+
+"""
+Async counterpart of app/crud/appointment.py, used by the async routers when DB_ASYNC is on.
+Relationships serialized by schemas.Appointment are loaded up front, an AsyncSession cannot lazy load.
+"""
+
+APPOINTMENT_LOADS = (
+    selectinload(models.Appointment.patient).selectinload(models.Patient.user),
+    selectinload(models.Appointment.patient).selectinload(models.Patient.medical_records),
+    selectinload(models.Appointment.hospital),
+    selectinload(models.Appointment.doctor).selectinload(models.Doctor.user),
+)
+
+
+def appointments_query():
+    return select(models.Appointment).options(*APPOINTMENT_LOADS)
+
+
+async def create_appointment(patient_id: int, payload: schemas.AppointmentCreate, db: AsyncSession):
+
+    appointment = models.Appointment(**payload.model_dump(), patient_id=patient_id)
+    db.add(appointment)
+    await db.commit()
+    await db.refresh(appointment)
+
+    notify_queue_change(appointment.hospital_id, QUEUE_ADDED, appointment.id)
+
+    return appointment
+
+
+async def get_appointments(skip: int, limit: int, db: AsyncSession) -> List[models.Appointment]:
+    query = appointments_query().order_by(models.Appointment.scheduled_time)
+    return (await db.scalars(query.offset(skip).limit(limit))).all()
+
+async def get_patient_appointments(patient_id: int, skip: int, limit: int, db: AsyncSession) -> List[models.Appointment]:
+    query = appointments_query().filter(models.Appointment.patient_id == patient_id).order_by(models.Appointment.scheduled_time)
+    return (await db.scalars(query.offset(skip).limit(limit))).all()
+
+async def get_appointment_by_id(appointment_id: int, db: AsyncSession) -> models.Appointment:
+    return await db.scalar(appointments_query().filter(models.Appointment.id == appointment_id))
+
+
+async def get_appointment_by_hospital_id(hospital_id: int, skip: int, limit: int, db: AsyncSession) -> List[models.Appointment]:
+    query = appointments_query().filter(models.Appointment.hospital_id == hospital_id).order_by(models.Appointment.scheduled_time)
+    return (await db.scalars(query.offset(skip).limit(limit))).all()
+
+
+async def get_hospital_appointment_history(hospital_id: int, skip: int, limit: int, db: AsyncSession, status: Optional[schemas.AppointmentStatus] = None) -> List[models.Appointment]:
+    query = appointments_query().filter(models.Appointment.hospital_id == hospital_id)
+
+    if status:
+        query = query.filter(models.Appointment.status == status)
+
+    return (await db.scalars(query.order_by(models.Appointment.scheduled_time.desc()).offset(skip).limit(limit))).all()
+
+
+async def get_appointment_by_doctor_id(doctor_id: int, skip: int, limit: int, db: AsyncSession) -> List[models.Appointment]:
+    query = appointments_query().filter(models.Appointment.doctor_id == doctor_id).order_by(models.Appointment.scheduled_time)
+    return (await db.scalars(query.offset(skip).limit(limit))).all()
+
+async def get_hospital_appointment_by_schedule_time(hospital_id: int, scheduled_time: str, db: AsyncSession) -> models.Appointment:
+    query = select(models.Appointment).filter(models.Appointment.hospital_id == hospital_id, models.Appointment.scheduled_time == scheduled_time)
+    return await db.scalar(query.limit(1))
+
+async def get_uncompleted_appointments(db: AsyncSession) -> List[models.Appointment]:
+    query = appointments_query().filter(models.Appointment.status != schemas.AppointmentStatus.COMPLETED).order_by(models.Appointment.scheduled_time)
+    return (await db.scalars(query)).all()
+
+async def cancel_appointment(appointment_id: int, db: AsyncSession):
+    appointment = await db.get(models.Appointment, appointment_id)
+
+    if not appointment:
+        return False
+
+    appointment.status = schemas.AppointmentStatus.CANCELED
+    await db.commit()
+
+    notify_queue_change(appointment.hospital_id, QUEUE_UPDATED, appointment.id)
+
+    return appointment
+
+async def get_pending_appointments(db: AsyncSession) -> List[models.Appointment]:
+    query = appointments_query().filter(models.Appointment.status == schemas.AppointmentStatus.PENDING).order_by(models.Appointment.scheduled_time)
+    return (await db.scalars(query)).all()
+
+
+async def get_patient_pending_appointments(patient_id: int, db: AsyncSession) -> models.Appointment:
+    query = select(models.Appointment).filter(
+        and_(
+            models.Appointment.patient_id == patient_id,
+            models.Appointment.status != schemas.AppointmentStatus.COMPLETED,
+            models.Appointment.status != schemas.AppointmentStatus.CANCELED
+        )
+    )
+    return await db.scalar(query.limit(1))
+
+
+async def switch_appointment_status(appointment_id: int, new_status: schemas.AppointmentStatusUpdate, db: AsyncSession) -> models.Appointment:
+    appointment = await db.get(models.Appointment, appointment_id)
+
+    if not appointment:
+        return False
+
+    appointment.status = new_status.status
+    await db.commit()
+
+    notify_queue_change(appointment.hospital_id, QUEUE_UPDATED, appointment.id)
+
+    return appointment
+
+
+async def delete_appointment(appointment_id: int, db: AsyncSession):
+    appointment = await db.get(models.Appointment, appointment_id)
+
+    if not appointment:
+        return False
+
+    await db.delete(appointment)
+    await db.commit()
+
+    notify_queue_change(appointment.hospital_id, QUEUE_REMOVED, appointment.id)
+
+    return True
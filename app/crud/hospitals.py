@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy.sql import or_
 from typing import Optional, List
 from app import models, schemas
+from app.principal_cache import principal_cache
 
 """
 creat hospital
@@ -57,12 +58,16 @@ def update_hospital(hospital_id: int, payload: schemas.HospitalUpdate, db: Sessi
     if not hospital:
         return False
     
+    # The email may change, so the cached principal is forgotten under the old one
+    old_email = hospital.email
     hospital_dict = payload.model_dump(exclude_unset=True)
     for k, v in hospital_dict.items():
         setattr(hospital, k, v)
     
     db.commit()
     db.refresh(hospital)
+    # After the commit, so a concurrent request cannot cache the old row again
+    principal_cache.invalidate(old_email, hospital.id)
 
     return hospital
 
@@ -72,4 +77,5 @@ def delete_hospital(hospital_id: int, db: Session):
         return False
     
     db.delete(hospital)
-    db.commit()
\ No newline at end of file
+    db.commit()
+    principal_cache.invalidate(hospital.email, hospital.id)
\ No newline at end of file
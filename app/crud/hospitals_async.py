@@ -0,0 +1,82 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy.sql import or_
+from typing import Optional, List
+from app import models, schemas
+from app.crud.appointment_async import appointments_query
+from app.principal_cache import principal_cache
+
+"""
+Async counterpart of app/crud/hospitals.py, used by the async routers when DB_ASYNC is on
+"""
+
+async def create_hospital(payload: schemas.HospitalCreate, db: AsyncSession) -> models.Hospital:
+    hospital = models.Hospital(**payload.model_dump())
+
+    db.add(hospital)
+    await db.commit()
+    await db.refresh(hospital)
+    return hospital
+
+
+async def get_hospital_by_email(db: AsyncSession, email: str) -> models.Hospital:
+    return await db.scalar(select(models.Hospital).filter(models.Hospital.email == email).limit(1))
+
+async def get_hospital_id(hospital_id: int, db: AsyncSession) -> models.Hospital:
+    return await db.get(models.Hospital, hospital_id)
+
+
+async def get_hospitals(db: AsyncSession, offset: int = 0, limit: int = 10, search: Optional[str] = "") -> List[models.Hospital]:
+    query = select(models.Hospital)
+
+    if search:
+        query = query.filter(
+            or_(models.Hospital.name.contains(search), models.Hospital.state.contains(search))
+            )
+
+    return (await db.scalars(query.offset(offset).limit(limit))).all()
+
+#get hospital doctors
+async def get_hospital_doctors(hospital_id: int, db: AsyncSession):
+    query = select(models.Doctor).options(selectinload(models.Doctor.user)).filter(models.Doctor.hospital_id == hospital_id)
+    return (await db.scalars(query)).all()
+
+#get available doctors
+async def get_hospital_available_doctors(hospital_id: int, db: AsyncSession):
+    query = select(models.Doctor).options(selectinload(models.Doctor.user)).filter(models.Doctor.hospital_id == hospital_id, models.Doctor.is_available == True)
+    return (await db.scalars(query)).all()
+
+#get all appointments
+async def get_hospital_appointments(hospital_id: int, db: AsyncSession):
+    return (await db.scalars(appointments_query().filter(models.Appointment.hospital_id == hospital_id))).all()
+
+async def get_hospital_by_name(name: str, db: AsyncSession) -> models.Hospital:
+    return await db.scalar(select(models.Hospital).filter(models.Hospital.name == name).limit(1))
+
+async def update_hospital(hospital_id: int, payload: schemas.HospitalUpdate, db: AsyncSession) -> models.Hospital:
+    hospital = await db.get(models.Hospital, hospital_id)
+    if not hospital:
+        return False
+
+    # The email may change, so the cached principal is forgotten under the old one
+    old_email = hospital.email
+    hospital_dict = payload.model_dump(exclude_unset=True)
+    for k, v in hospital_dict.items():
+        setattr(hospital, k, v)
+
+    await db.commit()
+    # After the commit, so a concurrent request cannot cache the old row again
+    principal_cache.invalidate(old_email, hospital.id)
+    await db.refresh(hospital)
+
+    return hospital
+
+async def delete_hospital(hospital_id: int, db: AsyncSession):
+    hospital = await db.get(models.Hospital, hospital_id)
+    if not hospital:
+        return False
+
+    await db.delete(hospital)
+    await db.commit()
+    principal_cache.invalidate(hospital.email, hospital.id)
@@ -1,11 +1,11 @@
 import string
 from fastapi import HTTPException
 from app import schemas
-from app.crud.hospitals import get_hospital_by_email
-from app.crud.users import get_user_by_email
+from app.crud.users import get_identities_by_email
 from sqlalchemy.orm import Session
 from app.utils import validate_hospital_password, validate_password
 from app.oauth2 import hash_password, verify_password
+from app.principal_cache import principal_cache
 import secrets
 from app.models import PasswordResetToken
 from datetime import datetime,timedelta
@@ -14,8 +14,7 @@ from datetime import datetime,timedelta
 
 def update_password(payload: schemas.PasswordResetConfirm, db: Session):
 
-    user = get_user_by_email(db=db, email=payload.email)
-    hospital = get_hospital_by_email(db=db, email=payload.email)
+    hospital, user = get_identities_by_email(db=db, email=payload.email)
     if not user and not hospital:
         raise HTTPException(
             status_code=404, detail="Not found"
@@ -42,6 +41,7 @@ def update_password(payload: schemas.PasswordResetConfirm, db: Session):
         user.password = new_password_hashed
         db.commit()
         db.refresh(user)
+        principal_cache.invalidate(user.email, user.id)
         return user
     
     #updating hospital's passsword
@@ -58,6 +58,7 @@ def update_password(payload: schemas.PasswordResetConfirm, db: Session):
         hospital.password = new_password_hashed
         db.commit()
         db.refresh(hospital)
+        principal_cache.invalidate(hospital.email, hospital.id)
         return hospital
    
 
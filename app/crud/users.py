@@ -1,14 +1,29 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from fastapi import Depends, HTTPException
-from sqlalchemy import or_
+from sqlalchemy import literal, or_, select
 from sqlalchemy.orm import Session
 from app import models, schemas
-from app.crud.hospitals import get_hospital_by_email
+from app.principal_cache import principal_cache
 
 def get_user_by_email(db: Session, email: str) -> models.User:
     return db.query(models.User).filter(models.User.email == email).first()
 
 
+def email_identities_query(email: str):
+    """ One row with the hospital and the user owning an email, either may be None.
+    Both tables are left joined to a one-row probe, so each side is a unique index lookup. """
+    probe = select(literal(email).label("email")).subquery()
+    return (select(models.Hospital, models.User)
+            .select_from(probe)
+            .outerjoin(models.Hospital, models.Hospital.email == probe.c.email)
+            .outerjoin(models.User, models.User.email == probe.c.email)
+            .limit(1))
+
+
+def get_identities_by_email(db: Session, email: str) -> Tuple[Optional[models.Hospital], Optional[models.User]]:
+    return tuple(db.execute(email_identities_query(email)).one())
+
+
 def get_users(db: Session, offset: int = 0, limit: int = 10, search: Optional[str] = "") -> List[models.User]:
     query = db.query(models.User)
 
@@ -30,18 +45,12 @@ def delete_user(db: Session, user_id: int):
 
     db.delete(user)
     db.commit()
+    principal_cache.invalidate(user.email, user.id)
 
 #getting all hospital and user's email address
 def confirm_emails(email: str, db: Session):
-    user_email = get_user_by_email(db=db, email=email)
-    hospital_email = get_hospital_by_email(db=db, email=email)
-    
-    if user_email:
-        return user_email
-    elif hospital_email:
-        return hospital_email
-    else:
-        return None
+    hospital, user = get_identities_by_email(db=db, email=email)
+    return user or hospital
 
 
 # def password_reset_email(email: str, db: Session):
@@ -0,0 +1,44 @@
+from typing import List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models
+from app.crud.users import email_identities_query
+from app.principal_cache import principal_cache
+
+"""
+Async counterpart of app/crud/users.py, used by the async routers when DB_ASYNC is on
+"""
+
+async def get_user_by_email(db: AsyncSession, email: str) -> models.User:
+    return await db.scalar(select(models.User).filter(models.User.email == email).limit(1))
+
+
+async def get_users(db: AsyncSession, offset: int = 0, limit: int = 10) -> List[models.User]:
+    return (await db.scalars(select(models.User).offset(offset).limit(limit))).all()
+
+async def get_user(db: AsyncSession, user_id: int) -> models.User:
+    return await db.get(models.User, user_id)
+
+async def delete_user(db: AsyncSession, user_id: int):
+    user = await get_user(db=db, user_id=user_id)
+    if not user:
+        return False
+
+    await db.delete(user)
+    await db.commit()
+    principal_cache.invalidate(user.email, user.id)
+    return True
+
+#getting all hospital and user's email address
+async def get_identities_by_email(db: AsyncSession, email: str) -> Tuple[Optional[models.Hospital], Optional[models.User]]:
+    return tuple((await db.execute(email_identities_query(email))).one())
+
+#hospital first, the same precedence as app.utils.get_hospital_or_user
+async def get_hospital_or_user(db: AsyncSession, email: str):
+    hospital, user = await get_identities_by_email(db=db, email=email)
+    return hospital or user
+
+#getting all hospital and user's email address
+async def confirm_emails(email: str, db: AsyncSession):
+    hospital, user = await get_identities_by_email(db=db, email=email)
+    return user or hospital
@@ -1,5 +1,11 @@
 import os
-from sqlalchemy import create_engine
+import time
+import itertools
+from contextlib import contextmanager
+from sqlalchemy import create_engine, exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
@@ -7,10 +13,119 @@ from dotenv import load_dotenv
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# "off" skips the startup check, "warn" logs a database behind the migrations, "strict" refuses to start
+DB_SCHEMA_CHECK = os.getenv("DB_SCHEMA_CHECK", "warn").lower()
+# Seconds startup waits for the check; past that "warn" starts anyway and "strict" fails
+DB_SCHEMA_CHECK_TIMEOUT = float(os.getenv("DB_SCHEMA_CHECK_TIMEOUT", 5))
+ALEMBIC_CONFIG = os.getenv("ALEMBIC_CONFIG", os.path.join(os.path.dirname(os.path.dirname(__file__)), "alembic.ini"))
+# Comma separated read replicas, list endpoints are spread over them
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# Serve the async routers from an async engine (asyncpg) instead of the sync one
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() == "true"
 
-engine = create_engine(DATABASE_URL)
+# Connection pool, per engine and per worker process
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+# Seconds a request waits for a free connection before "QueuePool limit reached"
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+# Replace connections older than this many seconds, -1 keeps them forever
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+# Test each connection on checkout so ones killed by a failover are replaced, not handed out
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+# Async drivers for the sync URLs in DATABASE_URL
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def to_async_url(url: str) -> str:
+    """ Swap the driver of a sync database URL for its async counterpart """
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername)).render_as_string(hide_password=False)
+
+
+class PoolWaitStats:
+    """ How long checkouts waited for a connection, and how many gave up """
+
+    def __init__(self):
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+
+    def record(self, wait: float):
+        self.checkouts += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+
+    def snapshot(self) -> dict:
+        return {
+            "checkouts": self.checkouts,
+            "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 3),
+            "timeouts": self.timeouts,
+        }
+
+
+class TimedPoolMixin:
+    """ Times every checkout, including the wait for a connection when the pool is exhausted """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.wait_stats.timeouts += 1
+            raise
+        finally:
+            self.wait_stats.record(time.perf_counter() - start)
+
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_options(url: str, poolclass: type) -> dict:
+    """ Pool settings from the environment, in-memory SQLite keeps its single-connection pool """
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+# The sync engine stays for Alembic, Celery/APScheduler jobs and the routers not ported yet
+engine = create_engine(DATABASE_URL, **pool_options(DATABASE_URL, TimedQueuePool))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Only built when enabled, so the async driver is not needed otherwise
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **pool_options(ASYNC_DATABASE_URL, TimedAsyncQueuePool)) if DB_ASYNC else None
+# Objects stay loaded after commit, lazy loads are not possible outside the session's greenlet
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False) if DB_ASYNC else None
+
+# Read-only engines, reads fall back to the primary when none are configured
+replica_engines = [create_engine(url, **pool_options(url, TimedQueuePool)) for url in DATABASE_REPLICA_URLS]
+async_replica_engines = [
+    create_async_engine(to_async_url(url), **pool_options(to_async_url(url), TimedAsyncQueuePool))
+    for url in DATABASE_REPLICA_URLS
+] if DB_ASYNC else []
+_next_replica = itertools.cycle(replica_engines or [engine])
+_next_async_replica = itertools.cycle(async_replica_engines or [async_engine])
+
 Base = declarative_base()
 
 # Dependency
@@ -21,4 +136,82 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# Read-only dependency for list endpoints, round-robins over the replicas.
+# Replicas lag the primary, so anything that must see its own writes keeps using get_db.
+def get_read_db():
+    db = SessionLocal(bind=next(_next_replica))
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db():
+    async with AsyncSessionLocal(bind=next(_next_async_replica)) as db:
+        yield db
+
+
+# Short-lived session for code outside a request, e.g. WebSocket handlers.
+# Long-lived sockets must not hold a pooled connection between operations.
+@contextmanager
+def session_scope():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def pool_status(bind: Engine = None) -> dict:
+    """ Gauges for an engine's pool: checked out, idle (checked in), overflow and checkout waits """
+    pool = (bind or engine).pool
+    status = {"pool": pool.__class__.__name__}
+    for gauge in ("size", "checkedin", "checkedout", "overflow"):
+        if hasattr(pool, gauge):
+            status[gauge] = getattr(pool, gauge)()
+    if hasattr(pool, "_max_overflow"):
+        status["max_overflow"] = pool._max_overflow
+        status["timeout"] = pool._timeout
+    if hasattr(pool, "wait_stats"):
+        status.update(pool.wait_stats.snapshot())
+    return status
+
+
+def check_schema_version(mode: str = DB_SCHEMA_CHECK):
+    """ Compare the database's Alembic revision with the latest migration.
+    Tables are never created here, run `alembic upgrade head` to migrate.
+    Outside strict mode an unreachable database is only logged, so it cannot stop a worker from booting. """
+    if mode == "off":
+        return
+
+    # Imported here so the app does not pay for Alembic unless the check is on
+    from alembic.config import Config
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    config = Config(ALEMBIC_CONFIG)
+    # script_location in alembic.ini is relative to the working directory, pin it to the repo
+    config.set_main_option("script_location", os.path.join(os.path.dirname(ALEMBIC_CONFIG), "alembic"))
+    heads = set(ScriptDirectory.from_config(config).get_heads())
+    try:
+        with engine.connect() as connection:
+            current = set(MigrationContext.configure(connection).get_current_heads())
+    except exc.SQLAlchemyError as e:
+        if mode == "strict":
+            raise
+        print(f"Warning: could not check the database schema version: {e}")
+        return
+
+    if current != heads:
+        message = f"Database schema is at {sorted(current) or 'no revision'}, migrations are at {sorted(heads)}. Run `alembic upgrade head`."
+        if mode == "strict":
+            raise RuntimeError(message)
+        print(f"Warning: {message}")
@@ -0,0 +1,112 @@
+import os
+import asyncio
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+load_dotenv()
+
+# "thread" works because bcrypt releases the GIL while hashing, "process" also isolates the CPU work
+HASH_EXECUTOR = os.getenv("HASH_EXECUTOR", "thread").lower()
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", os.cpu_count() or 1))
+# Hashes running or waiting for a worker; beyond this callers get 503 instead of queueing forever
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", 64))
+# New hashes use the first scheme, the others are still verified and get rehashed on login
+PASSWORD_HASH_SCHEMES = [scheme.strip() for scheme in os.getenv("PASSWORD_HASH_SCHEMES", "bcrypt").split(",") if scheme.strip()]
+# Cost of the first scheme (bcrypt log rounds), unset keeps passlib's default.
+# Hashes of any other cost count as outdated, so lowering it works as well as raising it.
+PASSWORD_HASH_ROUNDS = os.getenv("PASSWORD_HASH_ROUNDS")
+
+
+def crypt_context(schemes: list[str] = PASSWORD_HASH_SCHEMES, rounds: Optional[str] = PASSWORD_HASH_ROUNDS) -> CryptContext:
+    settings = {}
+    if rounds:
+        scheme = schemes[0]
+        settings = {f"{scheme}__default_rounds": int(rounds), f"{scheme}__min_rounds": int(rounds),
+                    f"{scheme}__max_rounds": int(rounds)}
+    return CryptContext(schemes=schemes, deprecated="auto", **settings)
+
+
+pwd_context = crypt_context()
+
+
+# Module level so the process pool can pickle them
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+class HashingExecutor:
+    """ Runs every password hash and verify on a dedicated pool, so bcrypt never runs on the
+    event loop or holds one of the threadpool's request threads. The pool is bounded:
+    at most queue_limit calls are running or waiting, the rest are refused with 503. """
+
+    def __init__(self, kind: str = HASH_EXECUTOR, workers: int = HASH_WORKERS, queue_limit: int = HASH_QUEUE_LIMIT):
+        self.kind = kind
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.slots = threading.BoundedSemaphore(queue_limit)
+        self.pool: Optional[Executor] = None
+        self.lock = threading.Lock()
+        self.rejected = 0
+
+    def _pool(self) -> Executor:
+        # Created on first use so importing the app does not start workers
+        with self.lock:
+            if self.pool is None:
+                if self.kind == "process":
+                    self.pool = ProcessPoolExecutor(max_workers=self.workers)
+                else:
+                    self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="hashing")
+            return self.pool
+
+    def submit(self, fn, *args) -> Future:
+        if not self.slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Server is busy, please try again shortly",
+                                headers={"Retry-After": "1"})
+        try:
+            future = self._pool().submit(fn, *args)
+        except Exception:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    def hash(self, password: str) -> str:
+        """ Blocking, for def routes already on a threadpool thread """
+        return self.submit(_hash, password).result()
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return self.submit(_verify, plain_password, hashed_password).result()
+
+    async def hash_async(self, password: str) -> str:
+        return await asyncio.wrap_future(self.submit(_hash, password))
+
+    async def verify_async(self, plain_password: str, hashed_password: str) -> bool:
+        return await asyncio.wrap_future(self.submit(_verify, plain_password, hashed_password))
+
+    @staticmethod
+    def needs_update(hashed_password: str) -> bool:
+        """ Whether a hash uses another scheme or cost than configured, cheap, no hashing """
+        return pwd_context.needs_update(hashed_password)
+
+    def shutdown(self):
+        with self.lock:
+            pool, self.pool = self.pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def metrics(self) -> dict:
+        return {"executor": self.kind, "workers": self.workers, "queue_limit": self.queue_limit,
+                "in_flight": self.queue_limit - self.slots._value, "rejected": self.rejected}
+
+
+hashing_executor = HashingExecutor()
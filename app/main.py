@@ -1,22 +1,29 @@
 import os
+import time
+import asyncio
 import redis
 from dotenv import load_dotenv
-from fastapi import FastAPI, WebSocket, Depends, WebSocketDisconnect
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 from apscheduler.schedulers.background import BackgroundScheduler
 from contextlib import asynccontextmanager
-from datetime import datetime
+from starlette.concurrency import run_in_threadpool
 
 # Import database and models
-from app.database import engine, Base, SessionLocal, get_db
-from app.models import Message
-from app.websocket_manager import manager
+from app.database import engine, async_engine, replica_engines, async_replica_engines, SessionLocal, DB_ASYNC, DB_SCHEMA_CHECK, DB_SCHEMA_CHECK_TIMEOUT, pool_status, check_schema_version
+from app.message_sink import message_sink
+from app.hashing import hashing_executor
+from app.sql_metrics import SQLMetricsMiddleware, instrument, route_metrics
+from app.websocket_manager import Heartbeat, encode_frame, manager
 from tasks import send_notification
 
 # Import routers
 from app.routers import (
     admins, auth, hospitals, medical_records, queue_sys, users, doctors,
-    sign_up_link as link_gen, email_validation, department, appointment, patients, password_reset, message
+    sign_up_link as link_gen, email_validation, department, appointment, patients, password_reset, message,
+    appointment_async, hospitals_async
 )
 from app.crud import sign_up_link as link
 from app.crud import password_reset as reset_token
@@ -26,6 +33,9 @@ from fastapi.middleware.cors import CORSMiddleware
 
 load_dotenv()
 
+# Read Redis credentials from environment variables
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
 # Function to schedule the cleanup task
 
 
@@ -53,13 +63,43 @@ def start_scheduler():
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Schema is managed by Alembic only, optionally refuse to start on a stale database
+    try:
+        await asyncio.wait_for(run_in_threadpool(check_schema_version), DB_SCHEMA_CHECK_TIMEOUT)
+    except asyncio.TimeoutError:
+        # A slow database must not hold up the worker unless the check is strict
+        if DB_SCHEMA_CHECK == "strict":
+            raise RuntimeError(f"Database schema check did not finish within {DB_SCHEMA_CHECK_TIMEOUT} seconds")
+        print(f"Warning: database schema check did not finish within {DB_SCHEMA_CHECK_TIMEOUT} seconds, skipped")
+    # Clients are created here rather than at import, so importing the app stays cheap
+    app.state.redis = redis.Redis.from_url(REDIS_URL, decode_responses=True)
     scheduler = start_scheduler()
+    # Pings chat and queue sockets and reaps the ones that went silent
+    heartbeat = Heartbeat([manager, queue_sys.manager])
+    heartbeat.start()
+    # Publishes appointments moving into and out of the live queue window
+    queue_sys.window_sweep.start()
     yield
+    await heartbeat.stop()
+    await queue_sys.window_sweep.stop()
+    # Commit chat messages still waiting in the write-behind buffer
+    await message_sink.drain()
+    hashing_executor.shutdown()
     scheduler.shutdown()
+    await queue_sys.coalescer.drain()
+    await queue_sys.manager.backend.close()
+    for bind in ([async_engine] if async_engine is not None else []) + async_replica_engines:
+        await bind.dispose()
+    app.state.redis.close()
 
 # Initialize the FastAPI application
 app = FastAPI(lifespan=lifespan)
 
+# Per-request query count and DB time, on every engine a route can use
+instrument(engine, *replica_engines,
+           *[bind.sync_engine for bind in ([async_engine] if async_engine is not None else []) + async_replica_engines])
+app.add_middleware(SQLMetricsMiddleware)
+
 # Add origins
 origins = [
     "http://localhost",
@@ -78,13 +118,9 @@ app.add_middleware(
     allow_credentials=True,
 )
 
-# Read Redis credentials from environment variables
-REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-redis_client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
-
-
 @app.get("/redis-test")
-def test_redis():
+def test_redis(request: Request):
+    redis_client = request.app.state.redis
     redis_client.set("message", "Hello from Redis!")
     return {"redis_message": redis_client.get("message")}
 
@@ -92,28 +128,36 @@ def test_redis():
 
 
 @app.websocket("/chat/{sender_id}/{receiver_id}")
-async def chat_endpoint(websocket: WebSocket, sender_id: int, receiver_id: int, db: Session = Depends(get_db)):
-    await manager.connect(websocket)
+async def chat_endpoint(websocket: WebSocket, sender_id: int, receiver_id: int):
+    """ Clients send plain message text, every frame the server sends is JSON:
+        {"type": "message", "id": n, "sender_id": n, "receiver_id": n, "message_text": text, "timestamp": iso}
+            once a message is stored, to the receiver and every socket of the sender, this one included,
+            so the echo doubles as the acknowledgement
+        {"type": "message_error"} when the message could not be stored, nobody else receives it
+        {"type": "ping"} heartbeat, may be answered with {"type": "pong"} """
+    connection = await manager.connect(websocket, sender_id)
     try:
         while True:
             data = await websocket.receive_text()
+            if connection.touch(data):
+                continue
 
-            # Store message in database
-            message = Message(sender_id=sender_id, receiver_id=receiver_id,
-                              message_text=data, timestamp=datetime.now())
-            db.add(message)
-            db.commit()
+            # Batched with other sockets' messages, returns once the row is committed
+            try:
+                message = await message_sink.save(sender_id, receiver_id, data)
+            except Exception:
+                connection.send(encode_frame({"type": "message_error"}))
+                continue
 
-            # Send the message to all connected clients
-            await manager.send_message(f"User {sender_id}: {data}")
+            # Deliver to the receiver and the sender's devices only, encoded once for all of them
+            manager.send_to_users((receiver_id, sender_id), encode_frame({
+                "type": "message", "id": message["id"], "sender_id": sender_id, "receiver_id": receiver_id,
+                "message_text": data, "timestamp": message["timestamp"]}))
 
             # Trigger notification in the background
             send_notification.delay(receiver_id, data)
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
-
-# Database initialization
-Base.metadata.create_all(bind=engine)
+        await manager.disconnect(connection, sender_id)
 
 # Include routers
 app.include_router(message.router)
@@ -122,11 +166,12 @@ app.include_router(email_validation.router)
 app.include_router(link_gen.router)
 app.include_router(auth.router)
 app.include_router(users.router)
-app.include_router(hospitals.router)
+# DB_ASYNC swaps in the async versions of the hot routers
+app.include_router(hospitals_async.router if DB_ASYNC else hospitals.router)
 app.include_router(doctors.router)
 app.include_router(patients.router)
 app.include_router(department.router)
-app.include_router(appointment.router)
+app.include_router(appointment_async.router if DB_ASYNC else appointment.router)
 app.include_router(admins.router)
 app.include_router(medical_records.router)
 app.include_router(queue_sys.router)
@@ -135,3 +180,37 @@ app.include_router(queue_sys.router)
 @app.get('/')
 def root():
     return {'message': 'Queue_Medix API!'}
+
+
+@app.get('/health/db')
+def database_health():
+    """ Round trip to the database plus pool gauges, for sizing pools per replica """
+    start = time.perf_counter()
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        health = {"status": "ok", "latency_ms": round((time.perf_counter() - start) * 1000, 3)}
+        status_code = status.HTTP_200_OK
+    except Exception as e:
+        print(f"Database health check failed: {e}")
+        health = {"status": "unavailable"}
+        status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+
+    health["pool"] = pool_status()
+    if replica_engines:
+        health["replicas"] = [pool_status(replica) for replica in replica_engines]
+    if async_engine is not None:
+        health["async_pool"] = pool_status(async_engine.sync_engine)
+    return JSONResponse(health, status_code=status_code)
+
+
+@app.get('/health/hashing')
+def hashing_health():
+    """ Password hashing pool usage, in_flight near queue_limit means logins are queueing """
+    return hashing_executor.metrics()
+
+
+@app.get('/metrics/sql')
+def sql_metrics():
+    """ Query count and DB time histograms per route, to spot routes that query too much """
+    return route_metrics.snapshot()
@@ -0,0 +1,147 @@
+import os
+import asyncio
+from datetime import datetime
+from typing import Optional
+from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import case
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.database import session_scope
+from app.models import Conversation, Message
+
+load_dotenv()
+
+# Most messages written by one INSERT
+MESSAGE_FLUSH_SIZE = int(os.getenv("MESSAGE_FLUSH_SIZE", 100))
+# Longest an idle sink waits for a batch to fill before writing, 0 writes straight away
+MESSAGE_FLUSH_INTERVAL_MS = int(os.getenv("MESSAGE_FLUSH_INTERVAL_MS", 0))
+
+
+def insert_messages(rows: list[dict]) -> list[int]:
+    """ Insert a batch of messages in one transaction, returns their ids in order """
+    with session_scope() as db:
+        messages = [Message(**row) for row in rows]
+        db.add_all(messages)
+        # Ids come back from the batched INSERT, read them before commit expires the objects
+        db.flush()
+        ids = [message.id for message in messages]
+        update_conversations(db, rows, ids)
+        db.commit()
+        return ids
+
+
+def update_conversations(db: Session, rows: list[dict], ids: list[int]):
+    """ Fold a batch of messages into the inbox summaries of both participants.
+    One upsert per batch: the last message moves forward and the receiver's unread count grows. """
+    summaries: dict[tuple[int, int], dict] = {}
+    for row, message_id in zip(rows, ids):
+        if row["sender_id"] is None or row["receiver_id"] is None:
+            continue
+        last = {"last_message_id": message_id, "last_sender_id": row["sender_id"],
+                "last_message_text": row["message_text"], "last_message_at": row["timestamp"]}
+        sender = summaries.setdefault((row["sender_id"], row["receiver_id"]), {"unread_count": 0})
+        sender.update(last)
+        if row["receiver_id"] != row["sender_id"]:
+            receiver = summaries.setdefault((row["receiver_id"], row["sender_id"]), {"unread_count": 0})
+            receiver.update(last)
+            receiver["unread_count"] += 1
+
+    if not summaries:
+        return
+
+    # Rows in key order, so two batches touching the same pairs lock them in the same order
+    # and cannot deadlock each other on PostgreSQL
+    values = [{"user_id": user_id, "other_user_id": other_user_id, **summary}
+              for (user_id, other_user_id), summary in sorted(summaries.items())]
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    statement = dialect.insert(Conversation).values(values)
+    excluded = statement.excluded
+    # Another worker may already have stored a newer message for the same pair
+    newer = excluded.last_message_id > Conversation.last_message_id
+    statement = statement.on_conflict_do_update(
+        index_elements=[Conversation.user_id, Conversation.other_user_id],
+        set_={
+            "last_message_id": case((newer, excluded.last_message_id), else_=Conversation.last_message_id),
+            "last_sender_id": case((newer, excluded.last_sender_id), else_=Conversation.last_sender_id),
+            "last_message_text": case((newer, excluded.last_message_text), else_=Conversation.last_message_text),
+            "last_message_at": case((newer, excluded.last_message_at), else_=Conversation.last_message_at),
+            "unread_count": Conversation.unread_count + excluded.unread_count,
+        },
+    )
+    db.execute(statement)
+
+
+class MessageSink:
+    """ Group commit for chat messages.
+    A message arriving while no write is running is written straight away; messages arriving
+    during a write are batched into the next one, at most flush_size per INSERT. Writes run
+    in a thread so the event loop never waits on the database. save() only returns once
+    its batch is committed, so callers can ack the sender and deliver safely. """
+
+    def __init__(self, flush_size: int = MESSAGE_FLUSH_SIZE, interval_ms: int = MESSAGE_FLUSH_INTERVAL_MS):
+        self.flush_size = flush_size
+        self.interval = interval_ms / 1000
+        self.buffer: list[tuple[dict, asyncio.Future]] = []
+        # Writes batches until the buffer is empty, None while idle
+        self.writer: Optional[asyncio.Task] = None
+        # Set once a full batch is waiting, ends the interval wait early
+        self.full = asyncio.Event()
+        # One batch at a time, so messages are committed in the order they were received
+        self.lock = asyncio.Lock()
+
+    async def save(self, sender_id: int, receiver_id: int, message_text: str) -> dict:
+        """ Buffer a message and wait until it is committed, returns the stored row with its id """
+        row = {"sender_id": sender_id, "receiver_id": receiver_id,
+               "message_text": message_text, "timestamp": datetime.now()}
+        future = asyncio.get_running_loop().create_future()
+        self.buffer.append((row, future))
+
+        if len(self.buffer) >= self.flush_size:
+            self.full.set()
+        if self.writer is None:
+            self.writer = asyncio.create_task(self._run())
+        return await future
+
+    async def _run(self):
+        try:
+            while self.buffer:
+                if self.interval and len(self.buffer) < self.flush_size:
+                    self.full.clear()
+                    try:
+                        await asyncio.wait_for(self.full.wait(), self.interval)
+                    except asyncio.TimeoutError:
+                        pass
+                await self.flush()
+        finally:
+            self.writer = None
+
+    async def flush(self):
+        """ Write up to flush_size buffered messages in one transaction """
+        async with self.lock:
+            batch, self.buffer = self.buffer[:self.flush_size], self.buffer[self.flush_size:]
+            if not batch:
+                return
+            try:
+                ids = await run_in_threadpool(insert_messages, [row for row, _ in batch])
+            except Exception as e:
+                print(f"Error saving {len(batch)} chat messages: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            for (row, future), message_id in zip(batch, ids):
+                if not future.done():
+                    future.set_result({"id": message_id, **row})
+
+    async def drain(self):
+        """ Flush whatever is still buffered, used on shutdown """
+        if self.writer is not None:
+            # Let the running write finish, its senders are waiting for the ack
+            self.full.set()
+            await self.writer
+        while self.buffer:
+            await self.flush()
+
+
+message_sink = MessageSink()
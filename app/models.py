@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Enum, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Enum, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -76,6 +76,12 @@ class Doctor(Base):
     appointments = relationship("Appointment", back_populates="doctor")
     medical_records = relationship("MedicalRecord", back_populates="doctor")
 
+    __table_args__ = (
+        # Hospital doctor lists and availability: hospital_id = ? [AND is_available = ?]
+        Index("ix_doctors_hospital_available", "hospital_id", "is_available"),
+        Index("ix_doctors_user_id", "user_id"),
+    )
+
 
 # Patient Model
 class Patient(Base):
@@ -97,6 +103,11 @@ class Patient(Base):
     user = relationship("User", back_populates="patient")
     appointments = relationship("Appointment", back_populates="patient")
 
+    __table_args__ = (
+        Index("ix_patients_user_id", "user_id"),
+        Index("ix_patients_hospital_card_id", "hospital_card_id"),
+    )
+
 
 # Admin Model
 class Admin(Base):
@@ -119,6 +130,10 @@ class Admin(Base):
     user = relationship("User", back_populates="admin")
     hospital = relationship("Hospital", back_populates="admin")
 
+    __table_args__ = (
+        Index("ix_admins_user_id", "user_id"),
+    )
+
 # Appointment Model
 
 
@@ -139,6 +154,18 @@ class Appointment(Base):
     hospital = relationship("Hospital", back_populates="appointments")
     doctor = relationship("Doctor", back_populates="appointments")
 
+    __table_args__ = (
+        # Live queue window: hospital_id = ? AND status IN (...) AND scheduled_time BETWEEN ...
+        Index("ix_appointments_queue_window", "hospital_id", "status", "scheduled_time"),
+        # Hospital listings and history ordered by scheduled_time
+        Index("ix_appointments_hospital_schedule", "hospital_id", "scheduled_time"),
+        # A patient's or doctor's appointments by time, and the patient's pending check
+        Index("ix_appointments_patient_schedule", "patient_id", "scheduled_time"),
+        Index("ix_appointments_doctor_schedule", "doctor_id", "scheduled_time"),
+        # Pending and uncompleted lists across hospitals
+        Index("ix_appointments_status_schedule", "status", "scheduled_time"),
+    )
+
 
 # Medical Record Model
 class MedicalRecord(Base):
@@ -171,7 +198,8 @@ class SignupLink(Base):
     token = Column(String, primary_key=True, unique=True, index=True)
     email = Column(String, nullable=False)
     is_used = Column(Boolean, default=False)
-    created_at = Column(DateTime, server_default=func.now())
+    # Daily cleanup deletes by created_at
+    created_at = Column(DateTime, server_default=func.now(), index=True)
 
 class PasswordResetToken(Base):
     __tablename__ = "password_reset_tokens"
@@ -180,7 +208,7 @@ class PasswordResetToken(Base):
     token = Column(String, unique=True, nullable=False)
     expires_at = Column(DateTime, nullable=False)
     is_used = Column(Boolean, default=False)
-    created_at = Column(DateTime, server_default=func.now())
+    created_at = Column(DateTime, server_default=func.now(), index=True)
 
 class Message(Base):
     __tablename__ = "messages"
@@ -193,3 +221,28 @@ class Message(Base):
 
     sender = relationship("User", foreign_keys=[sender_id])
     receiver = relationship("User", foreign_keys=[receiver_id])
+
+    __table_args__ = (
+        # One direction of a conversation in id order: sender_id = ? AND receiver_id = ? AND id < ?
+        Index("ix_messages_conversation", "sender_id", "receiver_id", "id"),
+    )
+
+
+# Inbox summary, one row per user and counterpart, kept up to date as messages are saved
+class Conversation(Base):
+    __tablename__ = "conversations"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    other_user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    last_message_id = Column(Integer, ForeignKey("messages.id"), nullable=False)
+    last_sender_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    last_message_text = Column(String, nullable=False)
+    last_message_at = Column(DateTime, nullable=False)
+    unread_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    other_user = relationship("User", foreign_keys=[other_user_id])
+
+    __table_args__ = (
+        # A user's inbox, most recent conversation first
+        Index("ix_conversations_user_recent", "user_id", "last_message_id"),
+    )
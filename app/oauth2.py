@@ -3,13 +3,16 @@ import os
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from dotenv import load_dotenv
 from app.utils import get_hospital_or_user
-from app.database import get_db
+from app.hashing import hashing_executor
+from app.principal_cache import PRINCIPAL_MODELS, principal_cache
+from app.database import get_async_db, get_db, session_scope
+from app.crud import users_async
 from app import schemas
 
 load_dotenv()
@@ -19,23 +22,49 @@ ALGORITHM = os.getenv('ALGORITHM')
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv('ACCESS_TOKEN_EXPIRE_MINUTES'))
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
 
+# bcrypt takes a few hundred ms, it always runs on the hashing executor.
+# The blocking versions are for def routes, async routes await the *_async ones.
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return hashing_executor.verify(plain_password, hashed_password)
 
 
-def authenticate_user(db: Session, email: str, password: str):
+async def verify_password_async(plain_password, hashed_password):
+    return await hashing_executor.verify_async(plain_password, hashed_password)
+
+
+async def authenticate_user(db: Session, email: str, password: str):
     user = get_hospital_or_user(db, email=email)
-    if not user or not verify_password(password, user.password):
+    if not user or not await verify_password_async(password, user.password):
+        return False
+    return user
+
+
+async def authenticate_user_async(db: AsyncSession, email: str, password: str):
+    """ authenticate_user on the async engine, used by /login when DB_ASYNC is on """
+    user = await users_async.get_hospital_or_user(db, email=email)
+    if not user or not await verify_password_async(password, user.password):
         return False
     return user
 
 
 def hash_password(password: str):
-    return pwd_context.hash(password)
+    return hashing_executor.hash(password)
+
+
+def rehash_password(model, principal_id: int, password: str, old_hash: str):
+    """ Background task after login: store the password again with the current scheme and cost.
+    Only replaces old_hash, so a password changed in the meantime is left alone. """
+    try:
+        new_hash = hash_password(password)
+        with session_scope() as db:
+            db.query(model).filter(model.id == principal_id, model.password == old_hash) \
+                .update({"password": new_hash}, synchronize_session=False)
+            db.commit()
+    except Exception as e:
+        print(f"Error rehashing password for {model.__tablename__} {principal_id}: {e}")
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -50,33 +79,76 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
-    credentials_exception = HTTPException(
+def credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=401,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def decode_access_token(token: str) -> tuple[str, int, Optional[str]]:
+    """ The (email, principal id, kind) an access token was issued for, kind is None on legacy tokens """
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         user_id: int = payload.get("user_id")
         user_role: Optional[str] = payload.get("user_role")
+        kind: Optional[str] = payload.get("kind")
 
         if not username or not user_id:
-            raise credentials_exception
+            raise credentials_exception()
+        if kind is not None and kind not in PRINCIPAL_MODELS:
+            raise credentials_exception()
     
         if user_role is not None:
             roles = {schemas.UserRole.ADMIN, schemas.UserRole.DOCTOR, schemas.UserRole.PATIENT}
 
         roles = {schemas.UserRole.ADMIN, schemas.UserRole.DOCTOR, schemas.UserRole.PATIENT}
         if user_role not in roles:
-            raise credentials_exception
+            raise credentials_exception()
         
     except JWTError:
-        raise credentials_exception
-    user = get_hospital_or_user(db, email=username)
-    if user is None:
-        raise credentials_exception
+        raise credentials_exception()
+    return username, user_id, kind
+
+
+def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
+    username, user_id, kind = decode_access_token(token)
+    if kind is None:
+        # Tokens issued before the kind claim was added, not cached since their kind is unknown
+        user = get_hospital_or_user(db, email=username)
+        if user is None:
+            raise credentials_exception()
+        return user
+
+    user = principal_cache.get(db, kind, username, user_id)
+    if user is not None:
+        return user
+    # The token names the table and primary key, one lookup
+    user = db.get(PRINCIPAL_MODELS[kind], user_id)
+    if user is None or user.email != username:
+        raise credentials_exception()
+    principal_cache.set(kind, username, user_id, user)
+    return user
+
+
+async def get_current_user_async(db: AsyncSession = Depends(get_async_db), token: str = Depends(oauth2_scheme)):
+    """ get_current_user for the async routers, loads the principal into their AsyncSession """
+    username, user_id, kind = decode_access_token(token)
+    if kind is None:
+        user = await users_async.get_hospital_or_user(db, email=username)
+        if user is None:
+            raise credentials_exception()
+        return user
+
+    user = await principal_cache.get_async(db, kind, username, user_id)
+    if user is not None:
+        return user
+    user = await db.get(PRINCIPAL_MODELS[kind], user_id)
+    if user is None or user.email != username:
+        raise credentials_exception()
+    await principal_cache.set_async(kind, username, user_id, user)
     return user
 
 ##### Email validation block
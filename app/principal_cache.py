@@ -0,0 +1,171 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Union
+import orjson
+import redis
+from dotenv import load_dotenv
+from sqlalchemy import DateTime, Enum, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+from starlette.concurrency import run_in_threadpool
+from app.models import Hospital, User
+
+load_dotenv()
+
+# How long a resolved principal is reused, 0 disables the cache
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", 60))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", 10000))
+# Optional shared cache, used instead of the per-process one so replicas share lookups and
+# invalidations. Unset keeps the cache per process.
+PRINCIPAL_CACHE_REDIS_URL = os.getenv("PRINCIPAL_CACHE_REDIS_URL")
+
+PRINCIPAL_MODELS = {"hospital": Hospital, "user": User}
+# Never cached or sent to Redis, loaded from the database if a route reads it
+UNCACHED_COLUMNS = {"password"}
+
+Principal = Union[Hospital, User]
+
+
+def principal_kind(principal: Principal) -> str:
+    """ "hospital" or "user", the kind claim of access tokens """
+    return "hospital" if isinstance(principal, Hospital) else "user"
+
+
+def _columns(model) -> dict:
+    return {column.key: column for column in inspect(model).columns if column.key not in UNCACHED_COLUMNS}
+
+
+def _decode(model, values: dict) -> dict:
+    """ Turn the JSON values read back from Redis into column types """
+    columns = _columns(model)
+    decoded = {}
+    for key, value in values.items():
+        column_type = columns[key].type
+        if value is not None and isinstance(column_type, DateTime):
+            value = datetime.fromisoformat(value)
+        elif value is not None and isinstance(column_type, Enum) and column_type.enum_class is not None:
+            value = column_type.enum_class(value)
+        decoded[key] = value
+    return decoded
+
+
+class PrincipalCache:
+    """ TTL-bounded LRU of the principals get_current_user resolves, keyed by the token's kind,
+    subject and id, since the same email may exist as both a hospital and a user.
+    Entries hold the column values only, not ORM objects: a hit is attached to the request's
+    session with merge(load=False), so routes get a normal persistent object without a query.
+    invalidate() must be called when a principal is deleted, deactivated, renamed or changes
+    password. With Redis configured the entries live in Redis only, so one invalidate() reaches
+    every worker; an in-process copy would keep serving the principal until its TTL ran out. """
+
+    def __init__(self, ttl: float = PRINCIPAL_CACHE_TTL, size: int = PRINCIPAL_CACHE_SIZE,
+                 redis_url: Optional[str] = PRINCIPAL_CACHE_REDIS_URL):
+        self.ttl = ttl
+        self.size = size
+        self.entries: OrderedDict[tuple[str, str, int], tuple[float, dict]] = OrderedDict()
+        # def routes resolve principals on threadpool threads
+        self.lock = threading.Lock()
+        self.redis = redis.Redis.from_url(redis_url) if redis_url else None
+
+    @staticmethod
+    def redis_key(kind: str, subject: str, principal_id: int) -> str:
+        return f"principal:{kind}:{subject}:{principal_id}"
+
+    def get(self, db: Session, kind: str, subject: str, principal_id: int) -> Optional[Principal]:
+        principal = self._lookup(kind, subject, principal_id)
+        return None if principal is None else db.merge(principal, load=False)
+
+    async def get_async(self, db: AsyncSession, kind: str, subject: str, principal_id: int) -> Optional[Principal]:
+        """ get() for an AsyncSession, the Redis tier is read on a threadpool thread """
+        if self.redis is None:
+            principal = self._lookup(kind, subject, principal_id)
+        else:
+            principal = await run_in_threadpool(self._lookup, kind, subject, principal_id)
+        return None if principal is None else await db.merge(principal, load=False)
+
+    def _lookup(self, kind: str, subject: str, principal_id: int) -> Optional[Principal]:
+        """ A detached principal built from the cached columns, None on a miss """
+        if not self.ttl:
+            return None
+        key = (kind, subject, principal_id)
+        if self.redis is not None:
+            entry = self._get_shared(key)
+        else:
+            now = time.monotonic()
+            with self.lock:
+                cached = self.entries.get(key)
+                if cached is not None and cached[0] > now:
+                    self.entries.move_to_end(key)
+                    entry = cached[1]
+                else:
+                    entry = None
+        if entry is None or entry["kind"] != kind:
+            return None
+
+        model = PRINCIPAL_MODELS[entry["kind"]]
+        principal = model(**entry["values"])
+        make_transient_to_detached(principal)
+        return principal
+
+    def set(self, kind: str, subject: str, principal_id: int, principal: Principal):
+        if not self.ttl or principal_kind(principal) != kind:
+            return
+        entry = {"kind": kind, "values": {key: getattr(principal, key) for key in _columns(type(principal))}}
+        key = (kind, subject, principal_id)
+        if self.redis is None:
+            self._store(key, entry)
+        else:
+            try:
+                self.redis.set(self.redis_key(*key), orjson.dumps(entry), px=int(self.ttl * 1000))
+            except redis.RedisError as e:
+                print(f"Error caching principal in Redis: {e}")
+
+    async def set_async(self, kind: str, subject: str, principal_id: int, principal: Principal):
+        """ set() that writes the Redis tier on a threadpool thread """
+        if self.redis is None:
+            self.set(kind, subject, principal_id, principal)
+        else:
+            await run_in_threadpool(self.set, kind, subject, principal_id, principal)
+
+    def invalidate(self, subject: str, principal_id: int):
+        """ Forget a principal everywhere, call after it is changed or removed """
+        keys = [(kind, subject, principal_id) for kind in PRINCIPAL_MODELS]
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+        if self.redis is not None:
+            try:
+                self.redis.delete(*(self.redis_key(*key) for key in keys))
+            except redis.RedisError as e:
+                print(f"Error invalidating principal in Redis: {e}")
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def _store(self, key: tuple[str, str, int], entry: dict):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, entry)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def _get_shared(self, key: tuple[str, str, int]) -> Optional[dict]:
+        if self.redis is None:
+            return None
+        try:
+            raw = self.redis.get(self.redis_key(*key))
+        except redis.RedisError as e:
+            print(f"Error reading principal from Redis: {e}")
+            return None
+        if raw is None:
+            return None
+        entry = orjson.loads(raw)
+        entry["values"] = _decode(PRINCIPAL_MODELS[entry["kind"]], entry["values"])
+        return entry
+
+
+principal_cache = PrincipalCache()
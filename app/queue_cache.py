@@ -0,0 +1,110 @@
+import asyncio
+import orjson
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+from app.utils import remaining_time
+
+Loader = Callable[[], Awaitable[tuple[int, list[dict]]]]
+
+
+class QueueSnapshotCache:
+    """ Last known queue per hospital, kept current by the queue events this worker receives.
+    Connects and resyncs are served from memory, concurrent misses share a single DB load.
+    Appointments drifting in and out of the live window are published by the window sweep,
+    which patches the cache like any other diff. """
+
+    def __init__(self):
+        # hospital_id -> (seq, {appointment_id: row})
+        self.snapshots: dict[int, tuple[int, dict[int, dict]]] = {}
+        self.loading: dict[int, asyncio.Task] = {}
+        # Events that arrive while a hospital's snapshot is still loading
+        self.pending: dict[int, list[dict]] = {}
+
+    async def get(self, hospital_id: int, load: Loader) -> tuple[int, list[dict]]:
+        """ Return (seq, rows ordered by time), loading the hospital's queue on a miss """
+        if hospital_id not in self.snapshots:
+            task = self.loading.get(hospital_id)
+            if task is None:
+                # Registered before the task runs, so events and discards in between are not missed
+                pending = self.pending[hospital_id] = []
+                task = asyncio.create_task(self._load(hospital_id, load, pending))
+                self.loading[hospital_id] = task
+            # Shielded so one waiter going away does not cancel the load for the others
+            await asyncio.shield(task)
+
+        snapshot = self.snapshots.get(hospital_id)
+        if snapshot is None:
+            # Discarded or invalidated while we waited, fall back to a direct load
+            seq, rows = await load()
+            return seq, sorted(rows, key=self._order)
+
+        seq, rows = snapshot
+        return seq, [{**row, "appointment_due": remaining_time(datetime.fromisoformat(row["time"]))}
+                     for row in sorted(rows.values(), key=self._order)]
+
+    async def _load(self, hospital_id: int, load: Loader, pending: list[dict]):
+        try:
+            seq, loaded = await load()
+            rows = {row["id"]: row for row in loaded}
+            # Loaded rows already reflect at least everything up to seq
+            for event in pending:
+                if event["seq"] > seq:
+                    seq = event["seq"]
+                    self._patch(rows, event)
+            # Only keep it if nobody discarded the hospital in the meantime
+            if self.pending.get(hospital_id) is pending:
+                self.snapshots[hospital_id] = (seq, rows)
+        finally:
+            if self.pending.get(hospital_id) is pending:
+                del self.pending[hospital_id]
+            del self.loading[hospital_id]
+
+    def apply(self, hospital_id: int, frame: str):
+        """ Patch the cached queue with an encoded queue event """
+        if hospital_id not in self.snapshots and hospital_id not in self.pending:
+            return
+
+        event = orjson.loads(frame)
+        if event.get("type") not in ("queue_snapshot", "queue_diff"):
+            return
+
+        if hospital_id in self.pending:
+            self.pending[hospital_id].append(event)
+            return
+
+        seq, rows = self.snapshots[hospital_id]
+        if event["seq"] <= seq:
+            return
+        if event["type"] == "queue_snapshot":
+            self.snapshots[hospital_id] = (event["seq"], {row["id"]: row for row in event["data"]})
+        elif event["seq"] == seq + 1:
+            self._patch(rows, event)
+            self.snapshots[hospital_id] = (event["seq"], rows)
+        else:
+            # Missed an event, the next reader reloads from the database
+            self.discard(hospital_id)
+
+    def peek(self, hospital_id: int) -> Optional[tuple[int, dict[int, dict]]]:
+        """ The cached (seq, {appointment_id: row}) without loading, None if not cached """
+        return self.snapshots.get(hospital_id)
+
+    def discard(self, hospital_id: int):
+        """ Forget a hospital, e.g. once this worker stops receiving its events """
+        self.snapshots.pop(hospital_id, None)
+        self.pending.pop(hospital_id, None)
+
+    @staticmethod
+    def _patch(rows: dict[int, dict], event: dict):
+        if event["type"] == "queue_snapshot":
+            rows.clear()
+            rows.update({row["id"]: row for row in event["data"]})
+            return
+        for change in event["changes"]:
+            if change["op"] == "removed":
+                rows.pop(change["data"]["id"], None)
+            else:
+                rows[change["data"]["id"]] = change["data"]
+
+    @staticmethod
+    def _order(row: dict):
+        return row["time"], row["id"]
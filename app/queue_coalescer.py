@@ -0,0 +1,95 @@
+import os
+import asyncio
+from typing import Awaitable, Callable
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Quiet period after the last change before a hospital's queue is flushed
+QUEUE_COALESCE_WINDOW_MS = int(os.getenv("QUEUE_COALESCE_WINDOW_MS", 150))
+# Upper bound on how long the first change of a burst may wait
+QUEUE_COALESCE_MAX_DELAY_MS = int(os.getenv("QUEUE_COALESCE_MAX_DELAY_MS", 1000))
+
+QUEUE_ADDED = "added"
+QUEUE_UPDATED = "updated"
+QUEUE_REMOVED = "removed"
+
+Flush = Callable[[int, dict[int, str]], Awaitable[None]]
+
+
+class QueueUpdateCoalescer:
+    """ Collects appointment changes per hospital and flushes each burst once.
+    A flush happens once the hospital has been quiet for the window, or when the
+    oldest pending change hits the max delay, whichever comes first. """
+
+    def __init__(self, flush: Flush, window_ms: int = QUEUE_COALESCE_WINDOW_MS,
+                 max_delay_ms: int = QUEUE_COALESCE_MAX_DELAY_MS):
+        self.flush = flush
+        self.window = window_ms / 1000
+        self.max_delay = max_delay_ms / 1000
+        # hospital_id -> {appointment_id: op}
+        self.pending: dict[int, dict[int, str]] = {}
+        self.deadlines: dict[int, float] = {}
+        self.started: dict[int, float] = {}
+        self.timers: dict[int, asyncio.Task] = {}
+        # Timers past their wait and inside flush(), never cancelled
+        self.flushing: set[asyncio.Task] = set()
+
+    def schedule(self, hospital_id: int, appointment_id: int, op: str):
+        """ Record a change, the hospital is flushed once the burst settles """
+        changes = self.pending.setdefault(hospital_id, {})
+        previous = changes.get(appointment_id)
+
+        if previous == QUEUE_ADDED and op == QUEUE_REMOVED:
+            # Clients never saw it, nothing to send
+            del changes[appointment_id]
+        elif previous != QUEUE_ADDED:
+            # An add followed by updates is still an add
+            changes[appointment_id] = op
+
+        now = asyncio.get_running_loop().time()
+        started = self.started.setdefault(hospital_id, now)
+        self.deadlines[hospital_id] = min(now + self.window, started + self.max_delay)
+
+        if hospital_id not in self.timers:
+            self.timers[hospital_id] = asyncio.create_task(self._run(hospital_id))
+
+    async def _run(self, hospital_id: int):
+        loop = asyncio.get_running_loop()
+        try:
+            while (delay := self.deadlines[hospital_id] - loop.time()) > 0:
+                await asyncio.sleep(delay)
+        finally:
+            # drain() may already have replaced it
+            if self.timers.get(hospital_id) is asyncio.current_task():
+                del self.timers[hospital_id]
+        # From here on drain() waits for this flush instead of cancelling it
+        task = asyncio.current_task()
+        self.flushing.add(task)
+        try:
+            await self._flush(hospital_id)
+        finally:
+            self.flushing.discard(task)
+
+    async def _flush(self, hospital_id: int):
+        changes = self.pending.pop(hospital_id, {})
+        self.deadlines.pop(hospital_id, None)
+        self.started.pop(hospital_id, None)
+        if not changes:
+            return
+        try:
+            await self.flush(hospital_id, changes)
+        except Exception as e:
+            print(f"Error flushing queue updates for hospital {hospital_id}: {e}")
+
+    async def drain(self):
+        """ Flush everything still pending right away, used on shutdown """
+        # Only timers still waiting are cancelled, their changes are flushed below.
+        # Forgotten here, a timer cancelled before it first ran never cleans up after itself.
+        timers, self.timers = self.timers, {}
+        for timer in timers.values():
+            timer.cancel()
+        for hospital_id in list(self.pending):
+            await self._flush(hospital_id)
+        if self.flushing:
+            await asyncio.gather(*self.flushing)
@@ -1,11 +1,11 @@
 from datetime import datetime, timezone
-from typing import List
+from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 # from app.oauth2 import get_current_user
 from sqlalchemy.orm import Session
 from app import schemas
 from app.crud import patients as pat_crud, appointment as apt_crud, hospitals as hp_crud, doctors as doc_crud
-from app.database import get_db
+from app.database import get_db, get_read_db
 
 """
 create an appointment
@@ -117,7 +117,7 @@ def get_patient_appointments(patient_id: int, skip: int = 0, limit: int = 10, db
     return appointments
 
 @router.get('/appointments/hospital/{hospital_id}', status_code=status.HTTP_200_OK, response_model=List[schemas.Appointment])
-def get_hospital_appointment(hospital_id: int, skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
+def get_hospital_appointment(hospital_id: int, skip: int = 0, limit: int = 10, db: Session = Depends(get_read_db)):
     
     hospital = hp_crud.get_hospital_id(hospital_id, db)
     if not hospital:
@@ -127,6 +127,18 @@ def get_hospital_appointment(hospital_id: int, skip: int = 0, limit: int = 10, d
     return appointments
 
 
+@router.get('/appointments/hospital/{hospital_id}/history', status_code=status.HTTP_200_OK, response_model=List[schemas.Appointment])
+def get_hospital_appointment_history(hospital_id: int, skip: int = 0, limit: int = 10, appointment_status: Optional[schemas.AppointmentStatus] = None, db: Session = Depends(get_db)):
+
+    hospital = hp_crud.get_hospital_id(hospital_id, db)
+    if not hospital:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Hospital not found")
+
+    # Newest first, the live queue WebSocket only covers the current window
+    appointments = apt_crud.get_hospital_appointment_history(hospital_id, skip, limit, db, status=appointment_status)
+    return appointments
+
+
 @router.get('/appointments/doctor/{doctor_id}', status_code=status.HTTP_200_OK, response_model=List[schemas.Appointment])
 def get_doctor_appointment(doctor_id: int, skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
 
@@ -0,0 +1,178 @@
+from datetime import datetime, timezone
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models, schemas
+from app.crud import appointment_async as apt_crud, hospitals_async as hp_crud
+from app.database import get_async_db, get_async_read_db
+
+"""
+Async version of app/routers/appointment.py, mounted instead of it when DB_ASYNC is on.
+Same paths and responses, but the DB waits no longer hold a threadpool thread or block the event loop.
+"""
+
+router = APIRouter(
+    tags=['Appointments']
+)
+
+@router.put('/appointments/{appointment_id}/assign_doctor', status_code=status.HTTP_202_ACCEPTED)
+async def assign_doctor(appointment_id: int, payload: schemas.AssignDoctor, db: AsyncSession = Depends(get_async_db)):
+
+    appointment = await db.get(models.Appointment, appointment_id)
+    if not appointment:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Appointment not found")
+
+    # Check if the doctor is available
+    doctor = await db.get(models.Doctor, payload.doctor_id)
+    if not doctor:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Doctor not found")
+
+    if not doctor.is_available:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Doctor has already been assigned")
+
+    # Assign doctor to the appointment and change doctor availability status
+    appointment.doctor_id = payload.doctor_id
+    doctor.is_available = False
+    await db.commit()
+
+    return {"message": "doctor assigned successfully!"}
+
+
+@router.post('/appointments/new_appointment', status_code=status.HTTP_201_CREATED)
+async def create_appointment(patient_id: int, apt_payload: schemas.AppointmentCreate, db: AsyncSession = Depends(get_async_db)):
+
+    patient = await db.get(models.Patient, patient_id)
+    if not patient:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Patient not found")
+
+    # Ensure scheduled_time is in the future
+    if apt_payload.scheduled_time < datetime.now(timezone.utc):
+        raise HTTPException(
+            status_code=400, detail="Appointment date cannot be in the past.")
+
+    # Check if time slot is available
+    time_is_taken = await apt_crud.get_hospital_appointment_by_schedule_time(
+        apt_payload.hospital_id, apt_payload.scheduled_time, db)
+    if time_is_taken:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="Time slot is already taken")
+
+    # Check if the patient is already scheduled for an appointment
+    existing_appointment = await apt_crud.get_patient_pending_appointments(
+        patient_id, db)
+    if existing_appointment:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                            detail="Patient already has a pending appointment")
+
+    # Check if the hospital exists
+    hospital = await hp_crud.get_hospital_id(apt_payload.hospital_id, db)
+    if not hospital:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Hospital not found")
+
+    await apt_crud.create_appointment(patient_id, apt_payload, db)
+
+    return {"message": "Appointment created successfully!"}
+
+
+@router.get('/appointments', status_code=status.HTTP_200_OK, response_model=List[schemas.Appointment])
+async def get_appointments(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_async_db)):
+    return await apt_crud.get_appointments(skip, limit, db)
+
+@router.get('/appointments/patient/{patient_id}', status_code=status.HTTP_200_OK, response_model=List[schemas.Appointment])
+async def get_patient_appointments(patient_id: int, skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_async_db)):
+
+    patient = await db.get(models.Patient, patient_id)
+    if not patient:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Patient not found")
+
+    return await apt_crud.get_patient_appointments(patient_id, skip, limit, db)
+
+@router.get('/appointments/hospital/{hospital_id}', status_code=status.HTTP_200_OK, response_model=List[schemas.Appointment])
+async def get_hospital_appointment(hospital_id: int, skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_async_read_db)):
+
+    hospital = await hp_crud.get_hospital_id(hospital_id, db)
+    if not hospital:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Hospital not found")
+
+    return await apt_crud.get_appointment_by_hospital_id(hospital_id, skip, limit, db)
+
+
+@router.get('/appointments/hospital/{hospital_id}/history', status_code=status.HTTP_200_OK, response_model=List[schemas.Appointment])
+async def get_hospital_appointment_history(hospital_id: int, skip: int = 0, limit: int = 10, appointment_status: Optional[schemas.AppointmentStatus] = None, db: AsyncSession = Depends(get_async_db)):
+
+    hospital = await hp_crud.get_hospital_id(hospital_id, db)
+    if not hospital:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Hospital not found")
+
+    # Newest first, the live queue WebSocket only covers the current window
+    return await apt_crud.get_hospital_appointment_history(hospital_id, skip, limit, db, status=appointment_status)
+
+
+@router.get('/appointments/doctor/{doctor_id}', status_code=status.HTTP_200_OK, response_model=List[schemas.Appointment])
+async def get_doctor_appointment(doctor_id: int, skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_async_db)):
+
+    doctor = await db.get(models.Doctor, doctor_id)
+    if not doctor:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Doctor not found")
+
+    return await apt_crud.get_appointment_by_doctor_id(doctor_id, skip, limit, db)
+
+@router.get('/appointments/uncompleted', status_code=status.HTTP_200_OK, response_model=List[schemas.Appointment])
+async def get_uncompleted_appointments(db: AsyncSession = Depends(get_async_db)):
+    return await apt_crud.get_uncompleted_appointments(db)
+
+@router.get('/appointments/pending_appointments', status_code=status.HTTP_200_OK, response_model=List[schemas.Appointment])
+async def get_pending_appointments(db: AsyncSession = Depends(get_async_db)):
+    return await apt_crud.get_pending_appointments(db)
+
+@router.get('/appointments/{appointment_id}', status_code=status.HTTP_200_OK, response_model=schemas.Appointment)
+async def get_appointment_by_id(appointment_id: int, db: AsyncSession = Depends(get_async_db)):
+
+    appointment = await apt_crud.get_appointment_by_id(appointment_id, db)
+    if not appointment:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Appointment not found")
+
+    return appointment
+
+
+@router.delete('/appointments/{appointment_id}/cancel', status_code=status.HTTP_202_ACCEPTED)
+async def cancel_appointment(appointment_id: int, db: AsyncSession = Depends(get_async_db)):
+
+    appointment = await db.get(models.Appointment, appointment_id)
+    if not appointment:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Appointment not found")
+
+    if appointment.status == schemas.AppointmentStatus.CANCELED:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Appointment is already canceled")
+
+    # Free the doctor in the same commit as the cancellation
+    if appointment.doctor_id is not None:
+        doctor = await db.get(models.Doctor, appointment.doctor_id)
+        if doctor:
+            doctor.is_available = True
+
+    await apt_crud.cancel_appointment(appointment_id, db)
+
+    return {"message": "Appointment has been cancelled successfully!"}
+
+
+#set appointment status
+@router.put('/appointments/{appointment_id}/appointment_status', status_code=status.HTTP_202_ACCEPTED)
+async def update_appointment_status(appointment_id: int, new_status: schemas.AppointmentStatusUpdate, db: AsyncSession = Depends(get_async_db)):
+
+    appointment = await apt_crud.switch_appointment_status(appointment_id, new_status, db)
+    if not appointment:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Appointment not found")
+
+    return {"message": f"Appointment status has been updated to {new_status.status}"}
+
+@router.delete('/appointments/{appointment_id}/delete', status_code=status.HTTP_202_ACCEPTED)
+async def delete_db_appointment(appointment_id: int, db: AsyncSession = Depends(get_async_db)):
+
+    if not await apt_crud.delete_appointment(appointment_id, db):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Appointment not found")
+
+    return {"message": "Appointment has been deleted successfully!"}
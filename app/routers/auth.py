@@ -1,14 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 from app.crud.users import get_user_by_email
 # from app.crud.password_reset import update_password, update_hospital_password
-from app.oauth2 import authenticate_user, create_access_token, get_current_user, hash_password
-from app.database import get_db
+from app.oauth2 import authenticate_user, authenticate_user_async, create_access_token, get_current_user, hash_password, rehash_password
+from app.hashing import hashing_executor
+from app.database import DB_ASYNC, get_async_db, get_db
 from app import models, schemas
 from app.crud.hospitals import get_hospital_by_email, create_hospital
 from app.utils import validate_hospital_password, validate_password
+from app.principal_cache import principal_kind
 
 router = APIRouter(
     tags=['Authentication']
@@ -207,9 +209,14 @@ def admin_signup(payload: schemas.UserCreate, token: str, db: Session = Depends(
 
 
 #### LOGIN ENDPOINT
+# DB_ASYNC looks the principal up on the async engine, so logins do not block the event loop on the DB
+login_db = get_async_db if DB_ASYNC else get_db
+login_authenticate = authenticate_user_async if DB_ASYNC else authenticate_user
+
+
 @router.post("/login", status_code=200)
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = authenticate_user(
+async def login(background_tasks: BackgroundTasks, form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(login_db)):
+    user = await login_authenticate(
         db, email=form_data.username.lower(), password=form_data.password)
     if not user:
         raise HTTPException(
@@ -217,8 +224,13 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+    # Hashed with an older scheme or cost: upgrade it after the response, the user waits for nothing
+    if hashing_executor.needs_update(user.password):
+        background_tasks.add_task(rehash_password, type(user), user.id, form_data.password, user.password)
     
-    token_data = {"sub": user.email, "user_id": user.id}
+    # kind and user_id let get_current_user load the principal by primary key
+    token_data = {"sub": user.email, "user_id": user.id, "kind": principal_kind(user)}
     if hasattr(user, 'role'):
         token_data["user_role"] = user.role
 
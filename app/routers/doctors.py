@@ -4,14 +4,14 @@ from app.oauth2 import get_current_user
 from sqlalchemy.orm import Session
 from app import schemas
 from app.crud import doctors as doctor_crud, admins as admin_crud, hospitals as hos_crud
-from app.database import get_db
+from app.database import get_db, get_read_db
 
 router = APIRouter(
     tags=['Doctors']
 )
 
 @router.get('/doctors', status_code=200, response_model=List[schemas.DoctorResponse])
-def get_all_doctors(db: Session = Depends(get_db), name: str = None, specialization: str = None,  offset: int = 0, limit: int = 10):
+def get_all_doctors(db: Session = Depends(get_read_db), name: str = None, specialization: str = None,  offset: int = 0, limit: int = 10):
     # if current_user.admin_type != schemas.AdminType.SUPER_ADMIN:
     #     raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Super Admin privileges required")
      
@@ -52,7 +52,7 @@ def get_doctor_by_id(doctor_id: int, db: Session = Depends(get_db)):
 
 
 @router.get('/doctors/availability/{hospital_id}', status_code=200, response_model=List[schemas.DoctorResponse])
-def get_available_doctors(hospital_id: int, db: Session = Depends(get_db), offset: int = 0, limit: int = 10):
+def get_available_doctors(hospital_id: int, db: Session = Depends(get_read_db), offset: int = 0, limit: int = 10):
     # if current_user.admin_type != schemas.AdminType.SUPER_ADMIN:
     #     if current_user.hospital_id != hospital_id:
     #         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You cannot check doctors of other hospitals")
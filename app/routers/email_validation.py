@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from app import database, schemas
 from app.crud import users as user_crud
 from app.oauth2 import create_email_validation_token, verify_email_validation_token
+from app.principal_cache import principal_cache
 
 router = APIRouter(
     tags=["Email Validation"]
@@ -43,6 +44,7 @@ def validate_email(token: str, db: Session = Depends(database.get_db)):
     user.is_active = True
     db.commit()
     db.refresh(user)
+    principal_cache.invalidate(user.email, user.id)
 
     return {"message": "Email validated and account activated"}
 
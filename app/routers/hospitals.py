@@ -4,7 +4,7 @@ from app.oauth2 import get_current_user
 from sqlalchemy.orm import Session
 from app import schemas, models
 from app.crud import hospitals as hospital_crud, admins as admin_crud
-from app.database import get_db
+from app.database import get_db, get_read_db
 
 router = APIRouter(
     tags=['Hospitals']
@@ -18,7 +18,7 @@ delete/remove hospital
 """
 
 @router.get("/hospitals", status_code=status.HTTP_200_OK, response_model=List[schemas.Hospital])
-def get_all_hospitals(db: Session = Depends(get_db), offset: int = 0, limit: int = 10, search: Optional[str] = ""):
+def get_all_hospitals(db: Session = Depends(get_read_db), offset: int = 0, limit: int = 10, search: Optional[str] = ""):
     hospitals = hospital_crud.get_hospitals(
         db,
         offset=offset,
@@ -0,0 +1,99 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.oauth2 import get_current_user_async
+from app import schemas, models
+from app.crud import hospitals_async as hospital_crud, admins as admin_crud
+from app.database import get_async_db, get_async_read_db
+
+"""
+Async version of app/routers/hospitals.py, mounted instead of it when DB_ASYNC is on
+"""
+
+router = APIRouter(
+    tags=['Hospitals']
+)
+
+@router.get("/hospitals", status_code=status.HTTP_200_OK, response_model=List[schemas.Hospital])
+async def get_all_hospitals(db: AsyncSession = Depends(get_async_read_db), offset: int = 0, limit: int = 10, search: Optional[str] = ""):
+    return await hospital_crud.get_hospitals(db, offset=offset, limit=limit, search=search)
+
+@router.get('/hospitals/doctors', status_code=status.HTTP_200_OK, response_model=List[schemas.HospitalDoctors])
+async def get_hospital_doctors(hospital_id: int, db: AsyncSession = Depends(get_async_db)):
+
+    hospital = await hospital_crud.get_hospital_id(hospital_id, db)
+    if not hospital:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Hospital not found")
+
+    return await hospital_crud.get_hospital_doctors(hospital_id, db)
+
+
+@router.get('/hospitals/available_doctors', status_code=status.HTTP_200_OK, response_model=List[schemas.HospitalDoctors])
+async def get_available_hospital_doctors(hospital_id: int, db: AsyncSession = Depends(get_async_db)):
+
+    hospital = await hospital_crud.get_hospital_id(hospital_id, db)
+    if not hospital:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Hospital not found")
+
+    return await hospital_crud.get_hospital_available_doctors(hospital_id, db)
+
+@router.get('/hospitals/appointments', status_code=status.HTTP_200_OK, response_model=List[schemas.Appointment])
+async def get_hospital_appointments(hospital_id: int, db: AsyncSession = Depends(get_async_db)):
+
+    hospital = await hospital_crud.get_hospital_id(hospital_id, db)
+    if not hospital:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Hospital not found")
+
+    return await hospital_crud.get_hospital_appointments(hospital_id, db)
+
+@router.get('/hospitals/{hospital_id}', status_code=status.HTTP_200_OK, response_model=schemas.Hospital)
+async def get_single_hospital(hospital_id: int, db: AsyncSession = Depends(get_async_db)):
+
+    hospital = await hospital_crud.get_hospital_id(hospital_id, db)
+    if not hospital:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Hospital not found")
+
+    return hospital
+
+@router.put('/hospitals/{hospital_id}', status_code=status.HTTP_202_ACCEPTED, response_model=schemas.Hospital)
+async def update_hospital(hospital_id: int, payload: schemas.HospitalUpdate, db: AsyncSession = Depends(get_async_db), current_user: models.Hospital = Depends(get_current_user_async), admin_user: models.User = Depends(get_current_user_async)):
+
+    #hospital availability check
+    hospital = await hospital_crud.get_hospital_id(hospital_id, db)
+    if not hospital:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Hospital not found"
+        )
+
+    # authorization check, admins have no async CRUD yet so it runs the sync one on the async session
+    user = await db.run_sync(admin_crud.get_admin_by_user_id, admin_user.id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Admin not found"
+        )
+
+    allowed_admins = {schemas.AdminType.SUPER_ADMIN, schemas.AdminType.HOSPITAL_ADMIN}
+
+    # Check if current user is an admin(endpoint is only accessible to super admins and hospital admins)
+    is_authorized = (user.admin_type in allowed_admins or current_user.id == hospital.id)
+
+    if not is_authorized:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="You are not authorized the access this resource."
+        )
+
+    return await hospital_crud.update_hospital(hospital_id, payload, db)
+
+@router.delete('/hospitals/{hospital_id}', status_code=status.HTTP_202_ACCEPTED)
+async def delete_hospital(hospital_id: int, db: AsyncSession = Depends(get_async_db)):
+
+    #hospital availability check
+    hospital = await hospital_crud.get_hospital_id(hospital_id, db)
+    if not hospital:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Hospital not found"
+        )
+
+    await hospital_crud.delete_hospital(hospital_id, db)
+
+    return{"message": "Hospital deleted successfully!"}
@@ -1,20 +1,96 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app.models import Message
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select, union_all
+from sqlalchemy.orm import Session, aliased
+from app.models import Conversation, Message, User
 from app.database import get_db
 
 router = APIRouter(
     tags=["Message Bot"]
 )
 
+CHAT_HISTORY_MAX_LIMIT = 200
+
+
+def conversation_page(db: Session, user_id: int, other_user_id: int, limit: int,
+                      before: Optional[int] = None, after: Optional[int] = None):
+    """ One page of a conversation by message id.
+    Each direction is its own range scan on ix_messages_conversation, limited before
+    the two are merged, so the cost depends on the page size, not the thread length. """
+    newest_first = after is None
+    directions = [(user_id, other_user_id)]
+    if other_user_id != user_id:
+        directions.append((other_user_id, user_id))
+
+    queries = []
+    for sender_id, receiver_id in directions:
+        query = db.query(Message).filter(Message.sender_id == sender_id, Message.receiver_id == receiver_id)
+        if before is not None:
+            query = query.filter(Message.id < before)
+        if after is not None:
+            query = query.filter(Message.id > after)
+        queries.append(query.order_by(Message.id.desc() if newest_first else Message.id).limit(limit))
+
+    if len(queries) > 1:
+        # Wrapped in subqueries so each branch keeps its own ORDER BY/LIMIT on every backend
+        page = aliased(Message, union_all(*(select(query.subquery()) for query in queries)).subquery())
+        query = db.query(page).order_by(page.id.desc() if newest_first else page.id).limit(limit)
+    else:
+        query = queries[0]
+    messages = query.all()
+    # Pages are always returned oldest first, like the full history used to be
+    return messages[::-1] if newest_first else messages
+
+
 @router.get("/chat/history/{user_id}/{other_user_id}")
-def get_chat_history(user_id: int, other_user_id: int, db: Session = Depends(get_db)):
-    messages = db.query(Message).filter(
-        ((Message.sender_id == user_id) & (Message.receiver_id == other_user_id)) |
-        ((Message.sender_id == other_user_id) & (Message.receiver_id == user_id))
-    ).order_by(Message.timestamp).all()
-    
-    return messages
+def get_chat_history(user_id: int, other_user_id: int,
+                     before: Optional[int] = None, after: Optional[int] = None,
+                     limit: int = Query(50, ge=1, le=CHAT_HISTORY_MAX_LIMIT),
+                     db: Session = Depends(get_db)):
+    """ Latest messages of a conversation, oldest first.
+    Pass before=<oldest id on screen> to scroll back, or after=<newest id> to catch up. """
+    if before is not None and after is not None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Use either before or after, not both")
+
+    return conversation_page(db, user_id, other_user_id, limit, before=before, after=after)
+
+
+@router.get("/chat/conversations/{user_id}")
+def get_conversations(user_id: int, skip: int = 0, limit: int = Query(50, ge=1, le=CHAT_HISTORY_MAX_LIMIT),
+                      db: Session = Depends(get_db)):
+    """ The user's inbox: each counterpart with the last message and unread count, most recent first.
+    Reads the conversations summary table, never the messages themselves. """
+    conversations = db.query(Conversation, User.first_name, User.last_name).join(
+        User, User.id == Conversation.other_user_id
+    ).filter(Conversation.user_id == user_id).order_by(
+        Conversation.last_message_id.desc()
+    ).offset(skip).limit(limit).all()
+
+    return [{
+        "other_user_id": conversation.other_user_id,
+        "first_name": first_name,
+        "last_name": last_name,
+        "last_message": {
+            "id": conversation.last_message_id,
+            "sender_id": conversation.last_sender_id,
+            "message_text": conversation.last_message_text,
+            "timestamp": conversation.last_message_at,
+        },
+        "unread_count": conversation.unread_count,
+    } for conversation, first_name, last_name in conversations]
+
+
+@router.post("/chat/conversations/{user_id}/{other_user_id}/read")
+def mark_conversation_read(user_id: int, other_user_id: int, db: Session = Depends(get_db)):
+    """ Reset the unread count once the user has opened the conversation """
+    updated = db.query(Conversation).filter(
+        Conversation.user_id == user_id, Conversation.other_user_id == other_user_id
+    ).update({Conversation.unread_count: 0}, synchronize_session=False)
+    db.commit()
+
+    if not updated:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found")
+    return {"message": "Conversation marked as read"}
 
 """
 We’ll use Redis and Celery for notifications.
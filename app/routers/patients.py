@@ -4,7 +4,7 @@ from app.oauth2 import get_current_user
 from sqlalchemy.orm import Session
 from app import schemas, models
 from app.crud import patients as patient_crud
-from app.database import get_db
+from app.database import get_db, get_read_db
 
 router = APIRouter(
     tags=['Patients']
@@ -18,7 +18,7 @@ delete patient
 """
 
 @router.get("/patients", status_code=status.HTTP_200_OK, response_model=List[schemas.PatientResponse])
-def get_all_patients(skip: int = 0, limit: int = 10, search: Optional[str] = "", db: Session = Depends(get_db)):
+def get_all_patients(skip: int = 0, limit: int = 10, search: Optional[str] = "", db: Session = Depends(get_read_db)):
     
     patients = patient_crud.get_patients(skip, limit, search, db)
     return patients
@@ -1,89 +1,474 @@
-from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
+import os
+import asyncio
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+from dotenv import load_dotenv
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from sqlalchemy import asc
-from app.database import get_db
-from app.models import Appointment
+from app.database import pool_status, session_scope
+from app.models import Appointment, Patient, User
+from app.schemas import AppointmentStatus
 from app.utils import remaining_time
+from app.broadcast import BroadcastBackend, get_broadcast_backend
+from app.queue_cache import QueueSnapshotCache
+from app.queue_coalescer import QueueUpdateCoalescer, QUEUE_ADDED, QUEUE_UPDATED, QUEUE_REMOVED
+from app.websocket_manager import WS_CLOSE_STALE, ClientConnection, encode_frame, manager as chat_manager
+
+load_dotenv()
 
 router = APIRouter(tags=['Appointment Queue'])
 
+"""
+Queue stream protocol (server -> client):
+    {"type": "queue_snapshot", "seq": n, "data": [appointment, ...]}
+    {"type": "queue_diff", "seq": n, "changes": [change, ...]}
+
+where each change is one of
+    {"op": "added" | "updated", "data": appointment}
+    {"op": "removed", "data": {"id": appointment_id}}
+
+The stream only covers the live window: pending and in-progress appointments
+scheduled between now - QUEUE_WINDOW_LOOKBACK_HOURS and now + QUEUE_WINDOW_LOOKAHEAD_HOURS.
+An appointment leaving the window (completed, canceled, rescheduled) is sent as removed;
+older appointments are served by the paginated /appointments/hospital/{id}/history endpoint.
+The window moves with the clock: every QUEUE_WINDOW_SWEEP_SECONDS each worker re-reads the
+window of the hospitals it has sockets for and sends the appointments that entered it as
+added and the ones that fell out of it as removed.
+
+Changes made within a short window are coalesced into one diff.
+Every diff bumps the hospital's sequence number by one. A client that sees a gap
+(seq != last_seq + 1) or receives {"type": "queue_resync"} because it fell too far
+behind sends the text "resync" and gets a fresh queue_snapshot.
+Diffs with seq <= the snapshot's seq are already included in it and can be skipped;
+added/updated diffs should be applied as upserts.
+
+A patient's phone can instead subscribe to /ws/queue/{hospital_id}/appointment/{appointment_id}
+and only receives its own position, no other patient's details:
+    {"type": "queue_position", "appointment_id": id, "position": n, "ahead": n - 1,
+     "eta_minutes": m, "status": "pending" | "in_progress"}
+position is 0 while the appointment is in progress and null once it left the live queue.
+
+Both streams get {"type": "ping"} every WS_PING_INTERVAL seconds (30 by default, 0 disables).
+Clients may reply with {"type": "pong"}; once a socket has answered a ping, sending nothing
+for WS_PING_INTERVAL + WS_PING_TIMEOUT seconds closes it with code 1001. Clients that never
+answer are not reaped by the app: half-open sockets are evicted by uvicorn's protocol-level
+pings, which close any socket that stops answering them.
+"""
+
+# How far around "now" the live queue reaches
+QUEUE_WINDOW_LOOKBACK_HOURS = float(os.getenv("QUEUE_WINDOW_LOOKBACK_HOURS", 12))
+QUEUE_WINDOW_LOOKAHEAD_HOURS = float(os.getenv("QUEUE_WINDOW_LOOKAHEAD_HOURS", 24))
+QUEUE_ACTIVE_STATUSES = (AppointmentStatus.PENDING, AppointmentStatus.IN_PROGRESS)
+# Rough consultation length used for the per-appointment ETA
+QUEUE_AVG_CONSULT_MINUTES = float(os.getenv("QUEUE_AVG_CONSULT_MINUTES", 15))
+# Seconds between re-reads of the live window of every hospital with sockets on this worker, 0 disables
+QUEUE_WINDOW_SWEEP_SECONDS = float(os.getenv("QUEUE_WINDOW_SWEEP_SECONDS", 60))
+
+# Sent in place of a backlog the client could not keep up with
+QUEUE_RESYNC = encode_frame({"type": "queue_resync"})
+
 
 class ConnectionManager:
-    def __init__(self):
+    def __init__(self, backend: BroadcastBackend):
         # Store active connections per hospital
-        self.active_connections: dict[int, list[WebSocket]] = {}
+        self.active_connections: dict[int, list[ClientConnection]] = {}
+        # Position-only subscribers: hospital_id -> appointment_id -> connections
+        self.position_connections: dict[int, dict[int, list[ClientConnection]]] = {}
+        # Last position pushed per appointment, so unchanged positions are not resent
+        self.positions: dict[int, dict[int, dict]] = {}
+        self.dropped_clients = 0
+        self.reaped_clients = 0
+        # Events are published through the backend so every worker receives them
+        self.backend = backend
+        self.backend.attach(self.broadcast)
+        # Queue per hospital this worker is subscribed to, patched by the events it receives
+        self.snapshots = QueueSnapshotCache()
 
-    async def connect(self, websocket: WebSocket, hospital_id: int):
-        """ Accept WebSocket connection and associate it with a hospital ID """
+    async def connect(self, websocket: WebSocket, hospital_id: int, appointment_id: Optional[int] = None) -> ClientConnection:
+        """ Accept WebSocket connection and associate it with a hospital ID,
+        or with a single appointment when the client only wants its position """
         await websocket.accept()
-        if hospital_id not in self.active_connections:
-            self.active_connections[hospital_id] = []
-        self.active_connections[hospital_id].append(websocket)
 
-    def disconnect(self, websocket: WebSocket, hospital_id: int):
-        """ Remove a disconnected WebSocket """
-        if hospital_id in self.active_connections:
-            self.active_connections[hospital_id].remove(websocket)
+        async def on_close(connection: ClientConnection):
+            # Reaped clients are already counted in reaped_clients
+            if await self._remove(connection, hospital_id, appointment_id) and connection.close_code != WS_CLOSE_STALE:
+                self.dropped_clients += 1
+
+        if not self._in_use(hospital_id):
+            # First local socket for this hospital, start listening for its events.
+            # Done before the connection exists so a broker outage leaves no writer task behind.
+            try:
+                await self.backend.subscribe(hospital_id)
+            except Exception:
+                await websocket.close(code=1011)
+                raise
+
+        if appointment_id is None:
+            connection = ClientConnection(websocket, on_close=on_close, resync_message=QUEUE_RESYNC)
+        else:
+            connection = ClientConnection(websocket, on_close=on_close)
+
+        if appointment_id is None:
+            self.active_connections.setdefault(hospital_id, []).append(connection)
+        else:
+            self.position_connections.setdefault(hospital_id, {}).setdefault(appointment_id, []).append(connection)
+        return connection
+
+    def _in_use(self, hospital_id: int) -> bool:
+        return hospital_id in self.active_connections or hospital_id in self.position_connections
+
+    async def _remove(self, connection: ClientConnection, hospital_id: int, appointment_id: Optional[int] = None) -> bool:
+        if appointment_id is None:
+            connections = self.active_connections.get(hospital_id)
+            if not connections or connection not in connections:
+                return False
+            connections.remove(connection)
             # Remove empty hospital lists
-            if not self.active_connections[hospital_id]:
+            if not connections:
                 del self.active_connections[hospital_id]
+        else:
+            appointments = self.position_connections.get(hospital_id, {})
+            connections = appointments.get(appointment_id)
+            if not connections or connection not in connections:
+                return False
+            connections.remove(connection)
+            if not connections:
+                del appointments[appointment_id]
+                self.positions.get(hospital_id, {}).pop(appointment_id, None)
+            if not appointments:
+                del self.position_connections[hospital_id]
+                self.positions.pop(hospital_id, None)
+
+        if not self._in_use(hospital_id):
+            await self.backend.unsubscribe(hospital_id)
+            # No longer receiving this hospital's events, so the cached copy would go stale
+            self.snapshots.discard(hospital_id)
+        return True
+
+    def connections(self) -> list[ClientConnection]:
+        """ Every socket on this worker, queue and position subscribers alike """
+        connections = [connection for hospital in self.active_connections.values() for connection in hospital]
+        for appointments in self.position_connections.values():
+            for subscribers in appointments.values():
+                connections.extend(subscribers)
+        return connections
+
+    async def disconnect(self, connection: ClientConnection, hospital_id: int, appointment_id: Optional[int] = None):
+        """ Remove a disconnected WebSocket """
+        await self._remove(connection, hospital_id, appointment_id)
+        await connection.close()
+
+    async def current_seq(self, hospital_id: int) -> int:
+        """ Sequence number of the last event published for a hospital """
+        return await self.backend.current_seq(hospital_id)
 
-    async def broadcast(self, hospital_id: int, message: dict):
-        """ Send a message to all clients connected to a specific hospital """
-        if hospital_id in self.active_connections:
-            for connection in self.active_connections[hospital_id]:
-                await connection.send_json(message)
+    async def next_seq(self, hospital_id: int) -> int:
+        """ Bump and return the sequence number for a hospital """
+        return await self.backend.next_seq(hospital_id)
 
+    async def publish(self, hospital_id: int, message: dict):
+        """ Send a message to the hospital's clients on every worker """
+        # Encoded once here, every worker and socket reuses the same frame
+        await self.backend.publish(hospital_id, encode_frame(message))
 
-manager = ConnectionManager()
+    async def broadcast(self, hospital_id: int, frame: str):
+        """ Queue an encoded frame for all clients connected to a specific hospital on this worker.
+        Only enqueues, each connection's writer task does the actual send. """
+        self.snapshots.apply(hospital_id, frame)
+        for connection in list(self.active_connections.get(hospital_id, ())):
+            connection.send(frame)
+        if hospital_id in self.position_connections:
+            await self.push_positions(hospital_id)
+
+    async def push_positions(self, hospital_id: int, appointment_id: Optional[int] = None):
+        """ Recompute positions from the hospital's cached queue in one pass and send
+        each position subscriber an update only when its own position or ETA changed.
+        Passing appointment_id forces a send to that appointment's subscribers. """
+        appointments = self.position_connections.get(hospital_id)
+        if not appointments:
+            return
+
+        _, rows = await load_snapshot(hospital_id)
+        positions = queue_positions(rows, appointments.keys())
+        last = self.positions.setdefault(hospital_id, {})
+
+        for subscribed_id, connections in list(appointments.items()):
+            position = positions[subscribed_id]
+            if last.get(subscribed_id) == position and subscribed_id != appointment_id:
+                continue
+            last[subscribed_id] = position
+            frame = encode_frame({"type": "queue_position", "appointment_id": subscribed_id, **position})
+            for connection in list(connections):
+                connection.send(frame)
+
+    def metrics(self) -> dict:
+        """ Live sockets and outbound queue depth per hospital, plus dropped and reaped client counts """
+        hospitals = {}
+        for hospital_id in self.active_connections.keys() | self.position_connections.keys():
+            depths = [connection.depth for connection in self.active_connections.get(hospital_id, ())]
+            position_subscribers = sum(len(connections) for connections in
+                                       self.position_connections.get(hospital_id, {}).values())
+            hospitals[hospital_id] = {
+                "connections": len(depths),
+                "position_subscribers": position_subscribers,
+                "queue_depth_total": sum(depths),
+                "queue_depth_max": max(depths, default=0),
+            }
+        return {
+            "hospitals": hospitals,
+            "live_connections": sum(hospital["connections"] + hospital["position_subscribers"]
+                                    for hospital in hospitals.values()),
+            "dropped_clients": self.dropped_clients,
+            "reaped_clients": self.reaped_clients,
+        }
+
+
+manager = ConnectionManager(get_broadcast_backend())
 
 
 @router.websocket("/ws/queue/{hospital_id}")
-async def websocket_endpoint(websocket: WebSocket, hospital_id: int, db: Session = Depends(get_db)):
-    """ WebSocket endpoint that streams queue updates filtered by hospital """
-    await manager.connect(websocket, hospital_id)
+async def websocket_endpoint(websocket: WebSocket, hospital_id: int):
+    """ WebSocket endpoint that streams queue updates filtered by hospital.
+    Holds no DB session, loads open a short-lived one only on a cache miss. """
+    connection = await manager.connect(websocket, hospital_id)
 
     try:
         # Send initial queue data when a client connects
-        await send_initial_queue(websocket, db, hospital_id)
+        await send_initial_queue(connection, hospital_id)
 
         while True:
-            await websocket.receive_text()  # Keep the connection alive
+            message = await websocket.receive_text()
+            if connection.touch(message):
+                continue
+            # Client detected a sequence gap and wants a fresh snapshot
+            if message.strip().lower() == "resync":
+                await send_initial_queue(connection, hospital_id)
     except WebSocketDisconnect:
-        manager.disconnect(websocket, hospital_id)
+        await manager.disconnect(connection, hospital_id)
+
+
+@router.websocket("/ws/queue/{hospital_id}/appointment/{appointment_id}")
+async def position_endpoint(websocket: WebSocket, hospital_id: int, appointment_id: int):
+    """ WebSocket endpoint that only streams one appointment's queue position and ETA """
+    connection = await manager.connect(websocket, hospital_id, appointment_id)
+
+    try:
+        await manager.push_positions(hospital_id, appointment_id)
+
+        while True:
+            message = await websocket.receive_text()
+            if connection.touch(message):
+                continue
+            if message.strip().lower() == "resync":
+                await manager.push_positions(hospital_id, appointment_id)
+    except WebSocketDisconnect:
+        await manager.disconnect(connection, hospital_id, appointment_id)
+
+
+@router.get("/ws/metrics")
+def websocket_metrics():
+    """ Outbound queue depth and dropped client counts for the queue and chat sockets,
+    plus DB pool usage to confirm idle sockets hold no connections """
+    return {"queue": manager.metrics(), "chat": chat_manager.metrics(), "db_pool": pool_status()}
+
+
+def queue_query(db: Session):
+    """ Projection with only the columns queue clients need, patient name joined in the same SELECT """
+    return db.query(
+        Appointment.id,
+        User.first_name,
+        User.last_name,
+        Appointment.patient_id,
+        Appointment.scheduled_time,
+        Appointment.status,
+    ).join(Patient, Appointment.patient_id == Patient.id).join(User, Patient.user_id == User.id)
+
+
+def in_queue_window(query):
+    """ Restrict a queue query to the live window, served by ix_appointments_queue_window """
+    now = datetime.now()
+    return query.filter(
+        Appointment.status.in_(QUEUE_ACTIVE_STATUSES),
+        Appointment.scheduled_time.between(
+            now - timedelta(hours=QUEUE_WINDOW_LOOKBACK_HOURS),
+            now + timedelta(hours=QUEUE_WINDOW_LOOKAHEAD_HOURS)
+        )
+    )
 
 
-async def notify_queue_update(db: Session, hospital_id: int):
-    """ Sends updated queue only to clients connected to the specific hospital """
-    queue = db.query(Appointment).filter(Appointment.hospital_id == hospital_id).order_by(
+def serialize_queue_row(row) -> dict:
+    """ Shape a single queue row the way queue clients expect it """
+    return {
+        "id": row.id,
+        "patient": row.first_name + " " + row.last_name,
+        "patient_id": row.patient_id,
+        "time": row.scheduled_time.isoformat(),
+        "status": row.status.value,
+        "appointment_due": remaining_time(row.scheduled_time)
+    }
+
+
+def get_queue_data(db: Session, hospital_id: int) -> list[dict]:
+    """ Load the live queue for a hospital ordered by scheduled time """
+    queue = in_queue_window(queue_query(db)).filter(Appointment.hospital_id == hospital_id).order_by(
         asc(Appointment.scheduled_time)
     ).all()
 
-    queue_data = [{
-        "id": appt.id,
-        "patient": appt.patient.user.first_name + " " + appt.patient.user.last_name,
-        "patient_id": appt.patient_id,
-        "time": appt.scheduled_time.isoformat(),
-        "status": appt.status.value,
-        "appointment_due": remaining_time(appt.scheduled_time)
-    } for appt in queue]
+    return [serialize_queue_row(row) for row in queue]
+
+
+def load_queue_data(hospital_id: int) -> list[dict]:
+    """ get_queue_data with a short-lived session of its own """
+    with session_scope() as db:
+        return get_queue_data(db, hospital_id)
+
+
+def load_queue_rows(appointment_ids: list[int]) -> dict[int, dict]:
+    """ Project the given appointments with a short-lived session of its own.
+    Appointments outside the live window are left out, so they go out as removed. """
+    with session_scope() as db:
+        rows = in_queue_window(queue_query(db)).filter(Appointment.id.in_(appointment_ids)).all()
+        return {row.id: serialize_queue_row(row) for row in rows}
+
+
+async def flush_queue_changes(hospital_id: int, changes: dict[int, str]):
+    """ Broadcasts one diff carrying every appointment changed during a burst """
+    upserts = [appointment_id for appointment_id, op in changes.items() if op != QUEUE_REMOVED]
+    rows = await run_in_threadpool(load_queue_rows, upserts) if upserts else {}
+
+    diff = []
+    for appointment_id, op in changes.items():
+        if op != QUEUE_REMOVED and appointment_id in rows:
+            diff.append({"op": op, "data": rows[appointment_id]})
+        elif op == QUEUE_ADDED:
+            # Booked outside the live window, clients never need to know about it
+            continue
+        else:
+            # Removed, moved out of the live window, or deleted again before the flush
+            diff.append({"op": QUEUE_REMOVED, "data": {"id": appointment_id}})
+
+    if not diff:
+        return
+
+    seq = await manager.next_seq(hospital_id)
+    await manager.publish(hospital_id, {"type": "queue_diff", "seq": seq, "changes": diff})
+
+
+coalescer = QueueUpdateCoalescer(flush_queue_changes)
+
+
+def notify_queue_change(hospital_id: int, op: str, appointment_id: int):
+    """ Queue an added/updated/removed appointment for the hospital's next coalesced diff """
+    coalescer.schedule(hospital_id, appointment_id, op)
+
+
+def queue_positions(rows: list[dict], appointment_ids: Iterable[int]) -> dict[int, dict]:
+    """ Position and ETA for the given appointments in one pass over the ordered queue """
+    wanted = set(appointment_ids)
+    positions = {appointment_id: {"position": None, "ahead": None, "eta_minutes": None, "status": None}
+                 for appointment_id in wanted}
+
+    for ahead, row in enumerate(rows):
+        if row["id"] not in wanted:
+            continue
+        if row["status"] == AppointmentStatus.IN_PROGRESS.value:
+            positions[row["id"]] = {"position": 0, "ahead": 0, "eta_minutes": 0, "status": row["status"]}
+        else:
+            positions[row["id"]] = {
+                "position": ahead + 1,
+                "ahead": ahead,
+                "eta_minutes": round(ahead * QUEUE_AVG_CONSULT_MINUTES),
+                "status": row["status"],
+            }
+    return positions
+
 
-    await manager.broadcast(hospital_id, {"type": "queue_update", "data": queue_data})
+async def load_snapshot(hospital_id: int) -> tuple[int, list[dict]]:
+    """ The hospital's live queue from the snapshot cache, loaded from the DB on a miss """
+    async def load():
+        # Read the sequence before the query so any diff racing the snapshot is still delivered
+        seq = await manager.current_seq(hospital_id)
+        return seq, await run_in_threadpool(load_queue_data, hospital_id)
 
+    return await manager.snapshots.get(hospital_id, load)
 
-async def send_initial_queue(websocket: WebSocket, db: Session, hospital_id: int):
+
+async def send_initial_queue(connection: ClientConnection, hospital_id: int):
     """ Sends the current queue to a newly connected WebSocket client for a specific hospital """
-    queue = db.query(Appointment).filter(Appointment.hospital_id == hospital_id).order_by(
-        asc(Appointment.scheduled_time)
-    ).all()
+    seq, queue_data = await load_snapshot(hospital_id)
+
+    # Goes through the outbound queue so it stays ordered with the diffs
+    connection.send(encode_frame({
+        "type": "queue_snapshot",
+        "seq": seq,
+        "data": queue_data
+    }))
+
+
+def _queue_fields(row: dict) -> dict:
+    """ A queue row without appointment_due, which differs on every read """
+    return {key: value for key, value in row.items() if key != "appointment_due"}
+
+
+async def sweep_queue_window(hospital_id: int):
+    """ Re-read a hospital's live window and publish what entered, left or changed in it
+    compared to the cached queue, which only follows the diffs published so far """
+    cached = manager.snapshots.peek(hospital_id)
+    if cached is None:
+        # Nothing cached to compare against, the next reader loads the current window
+        return
+    seq, rows = cached
+    fresh = {row["id"]: row for row in await run_in_threadpool(load_queue_data, hospital_id)}
+
+    current = manager.snapshots.peek(hospital_id)
+    if current is None or current[0] != seq:
+        # Events arrived during the read, compare again on the next sweep
+        return
+
+    changes = [{"op": QUEUE_REMOVED, "data": {"id": appointment_id}} for appointment_id in rows.keys() - fresh.keys()]
+    for appointment_id, row in fresh.items():
+        if appointment_id not in rows:
+            changes.append({"op": QUEUE_ADDED, "data": row})
+        elif _queue_fields(row) != _queue_fields(rows[appointment_id]):
+            changes.append({"op": QUEUE_UPDATED, "data": row})
+    if not changes:
+        return
+
+    seq = await manager.next_seq(hospital_id)
+    # Patches every worker's cache too, so their own sweep finds nothing left to send
+    await manager.publish(hospital_id, {"type": "queue_diff", "seq": seq, "changes": changes})
+
+
+class QueueWindowSweep:
+    """ Runs sweep_queue_window on an interval for every hospital with sockets on this worker,
+    so long-lived clients see appointments move into and out of the live window """
+
+    def __init__(self, interval: float = QUEUE_WINDOW_SWEEP_SECONDS):
+        self.interval = interval
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.interval > 0 and self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.sweep()
+
+    async def sweep(self):
+        for hospital_id in list(manager.active_connections.keys() | manager.position_connections.keys()):
+            try:
+                await sweep_queue_window(hospital_id)
+            except Exception as e:
+                print(f"Error sweeping the queue window of hospital {hospital_id}: {e}")
 
-    queue_data = [{
-        "id": appt.id,
-        "patient": appt.patient.user.first_name + " " + appt.patient.user.last_name,
-        "patient_id": appt.patient_id,
-        "time": appt.scheduled_time.isoformat(),
-        "status": appt.status.value,
-        "appointment_due": remaining_time(appt.scheduled_time)
-    } for appt in queue]
 
-    await websocket.send_json({"type": "queue_update", "data": queue_data})
+window_sweep = QueueWindowSweep()
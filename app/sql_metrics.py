@@ -0,0 +1,179 @@
+import os
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+load_dotenv()
+
+# Add X-DB-* headers to every response, meant for local debugging and staging
+SQL_DEBUG_HEADERS = os.getenv("SQL_DEBUG_HEADERS", "false").lower() == "true"
+# Fail the request when one statement shape runs more than this many times in it, 0 disables.
+# Set it in the test environment so N+1 queries fail the test instead of reaching production.
+SQL_REPEAT_LIMIT = int(os.getenv("SQL_REPEAT_LIMIT", 0))
+
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+DB_TIME_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+# Literals that may differ between two runs of the same query
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+# Expanded IN lists, so "IN (?, ?)" and "IN (?, ?, ?)" are the same shape
+IN_LISTS = re.compile(r"\(\s*(?:[?]|%\([^)]*\)s|\$\d+|:\w+)(?:\s*,\s*(?:[?]|%\([^)]*\)s|\$\d+|:\w+))*\s*\)")
+SPACES = re.compile(r"\s+")
+
+
+class RepeatedQueryError(RuntimeError):
+    """ One request ran the same statement shape more than SQL_REPEAT_LIMIT times """
+
+
+def statement_shape(statement: str) -> str:
+    """ The statement with literals, parameter lists and whitespace normalized """
+    shape = LITERALS.sub("?", statement)
+    shape = IN_LISTS.sub("(?)", shape)
+    return SPACES.sub(" ", shape).strip()
+
+
+class RequestStats:
+    """ Statements run while serving one request """
+
+    def __init__(self, repeat_limit: int = SQL_REPEAT_LIMIT):
+        self.repeat_limit = repeat_limit
+        self.count = 0
+        self.total = 0.0
+        self.slowest = 0.0
+        self.slowest_statement: Optional[str] = None
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, elapsed: float):
+        self.count += 1
+        self.total += elapsed
+        if elapsed >= self.slowest:
+            self.slowest = elapsed
+            self.slowest_statement = statement
+        if self.repeat_limit:
+            shape = statement_shape(statement)
+            self.shapes[shape] += 1
+            if self.shapes[shape] > self.repeat_limit:
+                raise RepeatedQueryError(
+                    f"Statement ran {self.shapes[shape]} times in one request (limit {self.repeat_limit}), "
+                    f"likely an N+1 query: {shape}")
+
+    def headers(self) -> list[tuple[bytes, bytes]]:
+        return [
+            (b"x-db-query-count", str(self.count).encode()),
+            (b"x-db-time-ms", f"{self.total * 1000:.3f}".encode()),
+            (b"x-db-slowest-ms", f"{self.slowest * 1000:.3f}".encode()),
+            (b"x-db-slowest-statement", statement_shape(self.slowest_statement or "")[:200].encode("ascii", "replace")),
+        ]
+
+
+# Stats of the request being served; the threadpool copies the context, so def routes see it too
+current_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_stats", default=None)
+
+
+class Histogram:
+    """ Cumulative bucket counts, in the Prometheus layout """
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.counts[-1] += 1
+
+    def snapshot(self) -> dict:
+        buckets = {str(bound): count for bound, count in zip(self.buckets, self.counts)}
+        buckets["+Inf"] = self.counts[-1]
+        return {"count": self.counts[-1], "sum": round(self.sum, 3), "buckets": buckets}
+
+
+class RouteMetrics:
+    """ Query count and DB time histograms per route template """
+
+    def __init__(self):
+        self.routes: dict[str, dict[str, Histogram]] = {}
+
+    def observe(self, route: str, stats: RequestStats):
+        histograms = self.routes.get(route)
+        if histograms is None:
+            histograms = self.routes[route] = {"queries": Histogram(QUERY_COUNT_BUCKETS),
+                                               "db_time_ms": Histogram(DB_TIME_BUCKETS_MS)}
+        histograms["queries"].observe(stats.count)
+        histograms["db_time_ms"].observe(stats.total * 1000)
+
+    def snapshot(self) -> dict:
+        return {route: {name: histogram.snapshot() for name, histogram in histograms.items()}
+                for route, histograms in sorted(self.routes.items())}
+
+
+route_metrics = RouteMetrics()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append((context, time.perf_counter()))
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()[1]
+    stats = current_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute does not fire for a failed statement, drop its start time here
+    # or it stays on the pooled connection forever
+    conn = exception_context.connection
+    starts = conn.info.get("query_start") if conn is not None else None
+    # Errors raised before the statement reached the cursor pushed nothing
+    if starts and starts[-1][0] is exception_context.execution_context:
+        starts.pop()
+
+
+def instrument(*binds: Engine):
+    """ Time every statement sent through these engines (pass async engines' sync_engine) """
+    for bind in binds:
+        if not event.contains(bind, "before_cursor_execute", _before_cursor_execute):
+            event.listen(bind, "before_cursor_execute", _before_cursor_execute)
+            event.listen(bind, "after_cursor_execute", _after_cursor_execute)
+            event.listen(bind, "handle_error", _handle_error)
+
+
+class SQLMetricsMiddleware:
+    """ Collects the statements of each HTTP request into a RequestStats,
+    records them per route and, in debug mode, returns them as X-DB-* headers.
+    Plain ASGI so the stats are in the same context the route runs in. """
+
+    def __init__(self, app, debug_headers: bool = SQL_DEBUG_HEADERS):
+        self.app = app
+        self.debug_headers = debug_headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_stats.set(stats)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start" and self.debug_headers:
+                message["headers"] = list(message.get("headers", [])) + stats.headers()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            current_stats.reset(token)
+            # The router leaves the matched route in the scope, unmatched paths are grouped
+            route = getattr(scope.get("route"), "path", "unmatched")
+            route_metrics.observe(f"{scope['method']} {route}", stats)
@@ -1,3 +1,4 @@
+import json
 import asyncio
 import websockets
 
@@ -5,7 +6,11 @@ async def test_websocket():
     uri = "ws://localhost:8000/chat/1/2"  # Replace with correct sender_id and receiver_id
     async with websockets.connect(uri) as websocket:
         await websocket.send("Hello from Python WebSocket client!")
-        response = await websocket.recv()
+        # Every server frame is JSON, the stored message comes back as {"type": "message", ...}
+        while True:
+            response = json.loads(await websocket.recv())
+            if response["type"] != "ping":
+                break
         print(f"Received: {response}")
 
 asyncio.run(test_websocket())
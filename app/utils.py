@@ -3,8 +3,7 @@ from sqlalchemy.orm import Session
 from app.models import SignupLink
 from datetime import datetime, timedelta
 
-from app.crud.hospitals import get_hospital_by_email
-from app.crud.users import get_user_by_email
+from app.crud.users import get_identities_by_email
 
 
 def validate_password(password: str, first_name: str, last_name: str) -> str:
@@ -44,10 +43,8 @@ def validate_hospital_password(password: str, name: str, owner_name: str) -> str
 
 # To get current user for authentication
 def get_hospital_or_user(db: Session, email: str):
-    user = get_hospital_by_email(db, email)
-    if not user:
-        user = get_user_by_email(db, email)
-    return user
+    hospital, user = get_identities_by_email(db, email)
+    return hospital or user
 
 def validate_signup_token(token: str, db: Session) -> bool:
     signup_link = db.query(SignupLink).filter(SignupLink.token == token).first()
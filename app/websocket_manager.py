@@ -1,19 +1,238 @@
-from typing import List
+import os
+import asyncio
+import orjson
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Union
 from fastapi import WebSocket
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Frames a single socket may have waiting before it counts as a slow consumer
+WS_OUTBOUND_QUEUE_SIZE = int(os.getenv("WS_OUTBOUND_QUEUE_SIZE", 100))
+# Seconds to wait for a close frame to go out to a dropped client
+WS_CLOSE_TIMEOUT = float(os.getenv("WS_CLOSE_TIMEOUT", 5))
+# Evicting half-open sockets relies on uvicorn's protocol-level pings (20 s interval and timeout
+# by default, tune with --ws-ping-interval / --ws-ping-timeout or UVICORN_WS_PING_*): a socket
+# that misses a pong is closed by uvicorn and its handler disconnects it. That covers every
+# client, listen-only displays included. App-level pings below also reap clients that answer
+# {"type": "ping"} and then go silent, e.g. behind a proxy that answers protocol pings itself.
+# Seconds between app-level pings, 0 disables them
+WS_PING_INTERVAL = float(os.getenv("WS_PING_INTERVAL", 30))
+# Seconds a client that answers pings may stay silent before it is treated as dead
+WS_PING_TIMEOUT = float(os.getenv("WS_PING_TIMEOUT", 20))
+
+# Close codes for a client that cannot keep up and one that stopped answering pings
+WS_CLOSE_SLOW = 1013
+WS_CLOSE_STALE = 1001
+
+Frame = Union[str, dict]
+
+
+def encode_frame(message: dict) -> str:
+    """ Serialize an event once so the same text frame can go to every subscriber """
+    return orjson.dumps(message).decode()
+
+
+# Clients answer with {"type": "pong"}, though any frame they send counts as a sign of life
+PING_FRAME = encode_frame({"type": "ping"})
+PONG_FRAME = encode_frame({"type": "pong"})
+
+
+def is_pong(message: str) -> bool:
+    """ True for a heartbeat reply, which should not be handled as a normal message """
+    return message.replace(" ", "") == PONG_FRAME
+
+
+class ClientConnection:
+    """ A WebSocket with a bounded outbound queue drained by its own writer task.
+    send() never awaits the socket, so one slow client cannot stall the others. """
+
+    def __init__(self, websocket: WebSocket, on_close: Callable[["ClientConnection"], Awaitable[None]],
+                 resync_message: Optional[Frame] = None, max_queue: int = WS_OUTBOUND_QUEUE_SIZE):
+        self.websocket = websocket
+        self.on_close = on_close
+        # Sent instead of the backlog when the queue overflows; without it the client is dropped
+        self.resync_message = resync_message
+        self.resync_pending = False
+        self.closed = False
+        # Close code the server dropped this client with, None while open or if the socket failed
+        self.close_code: Optional[int] = None
+        # Loop time of the last frame received from the client
+        self.last_seen = asyncio.get_running_loop().time()
+        # Only clients that answered a ping are reaped when they go silent,
+        # listen-only clients never send anything and must not be cut off
+        self.answers_pings = False
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.writer = asyncio.create_task(self._write())
+
+    @property
+    def depth(self) -> int:
+        return self.queue.qsize()
+
+    def touch(self, message: Optional[str] = None) -> bool:
+        """ Record that the client is still there, called for every received frame.
+        Returns True for a heartbeat reply, which should not be handled as a normal message """
+        self.last_seen = asyncio.get_running_loop().time()
+        if message is not None and is_pong(message):
+            self.answers_pings = True
+            return True
+        return False
+
+    def send(self, message: Frame) -> bool:
+        """ Queue a frame for this client, returns False if the client was dropped """
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            pass
+
+        # Still behind after being told to resync, give up on this client
+        if self.resync_message is None or self.resync_pending:
+            self.drop()
+            return False
+
+        # Throw away the backlog and ask the client to fetch a fresh snapshot
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(self.resync_message)
+        self.resync_pending = True
+        return True
+
+    def drop(self, code: int = WS_CLOSE_SLOW):
+        """ Stop writing to a slow or dead client and close its socket in the background """
+        if self.closed:
+            return
+        self.closed = True
+        self.close_code = code
+        self.writer.cancel()
+        asyncio.create_task(self._close(code))
+
+    async def _close(self, code: int):
+        try:
+            await asyncio.wait_for(self.websocket.close(code=code), timeout=WS_CLOSE_TIMEOUT)
+        except Exception:
+            pass
+        await self.on_close(self)
+
+    async def _write(self):
+        while True:
+            message = await self.queue.get()
+            if message is self.resync_message:
+                self.resync_pending = False
+            try:
+                if isinstance(message, str):
+                    await self.websocket.send_text(message)
+                else:
+                    await self.websocket.send_json(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Socket is gone, stop writing and let the manager forget it
+                self.closed = True
+                await self.on_close(self)
+                return
+
+    async def close(self):
+        """ Stop the writer once the socket has disconnected """
+        self.closed = True
+        self.writer.cancel()
+
+
+class Heartbeat:
+    """ Pings every socket of the given managers on an interval and drops the ones that
+    answered a ping before but have not sent anything for longer than interval + timeout,
+    so half-open connections (phones that lost signal) do not pile up and keep receiving frames. """
+
+    def __init__(self, managers: Iterable, interval: float = WS_PING_INTERVAL, timeout: float = WS_PING_TIMEOUT):
+        self.managers = list(managers)
+        self.interval = interval
+        self.timeout = timeout
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.interval > 0 and self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.beat()
+            except Exception as e:
+                print(f"Error during WebSocket heartbeat: {e}")
+
+    def beat(self):
+        """ Reap silent connections and ping the rest """
+        deadline = asyncio.get_running_loop().time() - self.interval - self.timeout
+        for manager in self.managers:
+            for connection in manager.connections():
+                if connection.answers_pings and connection.last_seen < deadline:
+                    manager.reaped_clients += 1
+                    connection.drop(WS_CLOSE_STALE)
+                else:
+                    connection.send(PING_FRAME)
+
 
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        # user_id -> that user's sockets, one per open device
+        self.active_connections: Dict[int, List[ClientConnection]] = {}
+        self.dropped_clients = 0
+        self.reaped_clients = 0
 
-    async def connect(self, websocket: WebSocket):
+    async def connect(self, websocket: WebSocket, user_id: int) -> ClientConnection:
         await websocket.accept()
-        self.active_connections.append(websocket)
 
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        async def on_close(connection: ClientConnection):
+            # Reaped clients are already counted in reaped_clients
+            if self._remove(connection, user_id) and connection.close_code != WS_CLOSE_STALE:
+                self.dropped_clients += 1
+
+        connection = ClientConnection(websocket, on_close=on_close)
+        self.active_connections.setdefault(user_id, []).append(connection)
+        return connection
+
+    def _remove(self, connection: ClientConnection, user_id: int) -> bool:
+        connections = self.active_connections.get(user_id)
+        if not connections or connection not in connections:
+            return False
+        connections.remove(connection)
+        if not connections:
+            del self.active_connections[user_id]
+        return True
+
+    async def disconnect(self, connection: ClientConnection, user_id: int):
+        self._remove(connection, user_id)
+        await connection.close()
+
+    def connections(self) -> List[ClientConnection]:
+        return [connection for connections in self.active_connections.values() for connection in connections]
+
+    def send_to_users(self, user_ids: Iterable[int], message: Frame) -> int:
+        """ Queue a message for every device of the given users, returns how many sockets got it """
+        delivered = 0
+        for user_id in set(user_ids):
+            for connection in list(self.active_connections.get(user_id, ())):
+                if connection.send(message):
+                    delivered += 1
+        return delivered
 
-    async def send_message(self, message: str):
-        for connection in self.active_connections:
-            await connection.send_text(message)
+    def metrics(self) -> dict:
+        depths = [connection.depth for connection in self.connections()]
+        return {
+            "users": len(self.active_connections),
+            "connections": len(depths),
+            "queue_depth_total": sum(depths),
+            "queue_depth_max": max(depths, default=0),
+            "dropped_clients": self.dropped_clients,
+            "reaped_clients": self.reaped_clients,
+        }
 
 manager = ConnectionManager()
@@ -0,0 +1,87 @@
+"""
+Micro-benchmark: cost of broadcasting one queue update as the number of subscribers grows.
+
+    python -m benchmarks.broadcast_fanout
+
+"per-socket json" is the old path (send_json on every socket, so json.dumps runs N times).
+"encode once" is the current path (encode_frame once, the same text frame goes to every socket).
+"""
+import json
+import time
+import asyncio
+from datetime import datetime, timedelta
+from app.websocket_manager import ClientConnection, encode_frame
+
+SUBSCRIBERS = [1, 10, 100, 1000, 5000]
+QUEUE_ROWS = 500
+ROUNDS = 20
+
+
+class NullWebSocket:
+    """ Accepts frames without doing I/O, the way Starlette would hand them to the transport """
+
+    async def send_text(self, data: str):
+        data.encode("utf-8")
+
+    async def send_json(self, data: dict):
+        json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+def sample_snapshot() -> dict:
+    now = datetime.now()
+    return {"type": "queue_snapshot", "seq": 1, "data": [{
+        "id": i,
+        "patient": f"Patient {i}",
+        "patient_id": i,
+        "time": (now + timedelta(minutes=i)).isoformat(),
+        "status": "pending",
+        "appointment_due": "0 days, 1 hours, 0 minutes, 0 seconds",
+    } for i in range(QUEUE_ROWS)]}
+
+
+async def drain(connections: list[ClientConnection]):
+    while any(connection.depth for connection in connections):
+        await asyncio.sleep(0)
+
+
+async def run(subscribers: int, message: dict) -> tuple[float, float]:
+    async def on_close(connection):
+        pass
+
+    connections = [ClientConnection(NullWebSocket(), on_close=on_close, max_queue=ROUNDS + 1)
+                   for _ in range(subscribers)]
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for connection in connections:
+            connection.send(message)
+        await drain(connections)
+    per_socket = (time.perf_counter() - start) / ROUNDS
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        frame = encode_frame(message)
+        for connection in connections:
+            connection.send(frame)
+        await drain(connections)
+    encode_once = (time.perf_counter() - start) / ROUNDS
+
+    for connection in connections:
+        await connection.close()
+    return per_socket, encode_once
+
+
+async def main():
+    message = sample_snapshot()
+    print(f"{QUEUE_ROWS}-row snapshot, {len(encode_frame(message))} bytes per frame")
+    print(f"{'subscribers':>11} {'per-socket json':>16} {'encode once':>12} {'speedup':>8}")
+    for subscribers in SUBSCRIBERS:
+        per_socket, encode_once = await run(subscribers, message)
+        print(f"{subscribers:>11} {per_socket * 1000:>13.2f} ms {encode_once * 1000:>9.2f} ms {per_socket / encode_once:>7.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,71 @@
+"""
+Benchmark: chat messages persisted per second with many senders writing at once.
+
+    DATABASE_URL=postgresql://... python -m benchmarks.chat_persist
+
+"commit per message" is the old path (one session and commit per frame, on the event loop).
+"write-behind" is the current path (MessageSink batches rows into one INSERT per flush).
+Both write into the messages table of DATABASE_URL and delete their rows afterwards.
+"""
+import time
+import asyncio
+from datetime import datetime
+from app.database import Base, engine, session_scope
+from app.message_sink import MessageSink
+from app.models import Message
+
+SENDERS = [1, 10, 100]
+MESSAGES_PER_SENDER = 50
+
+
+def commit_one(text: str):
+    with session_scope() as db:
+        db.add(Message(sender_id=None, receiver_id=None, message_text=text, timestamp=datetime.now()))
+        db.commit()
+
+
+async def commit_per_message(senders: int) -> float:
+    async def sender(sender_id: int):
+        for i in range(MESSAGES_PER_SENDER):
+            commit_one(f"bench {sender_id} {i}")
+            await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(sender(s) for s in range(senders)))
+    return senders * MESSAGES_PER_SENDER / (time.perf_counter() - start)
+
+
+async def write_behind(senders: int) -> float:
+    sink = MessageSink()
+
+    async def sender(sender_id: int):
+        for i in range(MESSAGES_PER_SENDER):
+            # Like the chat socket: wait for the ack before the next message
+            await sink.save(None, None, f"bench {sender_id} {i}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(sender(s) for s in range(senders)))
+    await sink.drain()
+    return senders * MESSAGES_PER_SENDER / (time.perf_counter() - start)
+
+
+def cleanup():
+    with session_scope() as db:
+        db.query(Message).filter(Message.message_text.like("bench %")).delete(synchronize_session=False)
+        db.commit()
+
+
+async def main():
+    Base.metadata.create_all(bind=engine)
+    print(f"{MESSAGES_PER_SENDER} messages per sender on {engine.url.get_backend_name()}")
+    print(f"{'senders':>7} {'commit per message':>19} {'write-behind':>14} {'speedup':>8}")
+    for senders in SENDERS:
+        before = await commit_per_message(senders)
+        cleanup()
+        after = await write_behind(senders)
+        cleanup()
+        print(f"{senders:>7} {before:>13.0f} msg/s {after:>8.0f} msg/s {after / before:>7.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
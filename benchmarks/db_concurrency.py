@@ -0,0 +1,76 @@
+"""
+Benchmark: hospital lookups per second at high concurrency, sync engine vs async engine.
+
+    DATABASE_URL=postgresql://... python -m benchmarks.db_concurrency
+
+"sync" is what a def route does: a Session from SessionLocal, the query runs on a threadpool thread.
+"async" is the DB_ASYNC path: an AsyncSession on the async driver, no thread per request.
+Both read the hospitals already in DATABASE_URL, so seed some first.
+"""
+import time
+import asyncio
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.concurrency import run_in_threadpool
+from app.database import DATABASE_URL, SessionLocal, to_async_url
+from app.models import Hospital
+from app.crud import hospitals as hp_crud, hospitals_async as hp_crud_async
+
+CONCURRENCY = [1, 10, 50, 200]
+REQUESTS = 2000
+
+
+def sync_lookup(hospital_id: int):
+    db = SessionLocal()
+    try:
+        hp_crud.get_hospital_id(hospital_id, db)
+    finally:
+        db.close()
+
+
+async def run_sync(ids: list[int], concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def request(hospital_id: int):
+        async with semaphore:
+            await run_in_threadpool(sync_lookup, hospital_id)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(request(ids[i % len(ids)]) for i in range(REQUESTS)))
+    return REQUESTS / (time.perf_counter() - start)
+
+
+async def run_async(sessions: async_sessionmaker, ids: list[int], concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def request(hospital_id: int):
+        async with semaphore:
+            async with sessions() as db:
+                await hp_crud_async.get_hospital_id(hospital_id, db)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(request(ids[i % len(ids)]) for i in range(REQUESTS)))
+    return REQUESTS / (time.perf_counter() - start)
+
+
+async def main():
+    engine = create_async_engine(to_async_url(DATABASE_URL))
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    async with sessions() as db:
+        ids = (await db.scalars(select(Hospital.id).limit(500))).all()
+        total = await db.scalar(select(func.count(Hospital.id)))
+    if not ids:
+        print("No hospitals in DATABASE_URL, seed some first")
+        return
+
+    print(f"{REQUESTS} lookups over {total} hospitals on {engine.url.get_backend_name()}")
+    print(f"{'concurrency':>11} {'sync':>12} {'async':>12} {'speedup':>8}")
+    for concurrency in CONCURRENCY:
+        sync_rate = await run_sync(ids, concurrency)
+        async_rate = await run_async(sessions, ids, concurrency)
+        print(f"{concurrency:>11} {sync_rate:>8.0f} r/s {async_rate:>8.0f} r/s {async_rate / sync_rate:>7.1f}x")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,91 @@
+"""
+EXPLAIN check: the hot CRUD queries are planned on the indexes from migration 0003.
+
+    DATABASE_URL=postgresql://... python -m benchmarks.explain_indexes
+
+Each check runs the real CRUD function once, captures the first statement it sends,
+and asks the planner for that statement's plan. Exits with 1 if an index is not used.
+A check may list fallbacks, accepted on SQLite only: without statistics SQLite serves the
+queue window from the (hospital_id, scheduled_time) range and filters status, which is still
+an index range scan. PostgreSQL, where the app runs, must use the first index of every check.
+There sequential scans are disabled for the check, otherwise a small table is always
+scanned and the plan says nothing about whether the index is usable.
+"""
+import sys
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app.database import SessionLocal, engine
+from app.models import PasswordResetToken, SignupLink
+from app.crud import admins as admin_crud, appointment as apt_crud, doctors as doc_crud, \
+    hospitals as hospital_crud, patients as pat_crud
+from app.routers.message import conversation_page
+from app.routers.queue_sys import get_queue_data
+
+# The cleanup jobs delete, so their WHERE clause is checked through an equivalent SELECT
+CUTOFF = datetime.now() - timedelta(hours=24)
+
+CHECKS = [
+    (("ix_appointments_queue_window", "ix_appointments_hospital_schedule"), lambda db: get_queue_data(db, 1)),
+    ("ix_appointments_hospital_schedule", lambda db: apt_crud.get_appointment_by_hospital_id(1, 0, 10, db)),
+    ("ix_appointments_patient_schedule", lambda db: apt_crud.get_patient_appointments(1, 0, 10, db)),
+    ("ix_appointments_doctor_schedule", lambda db: apt_crud.get_appointment_by_doctor_id(1, 0, 10, db)),
+    ("ix_appointments_status_schedule", lambda db: apt_crud.get_pending_appointments(db)),
+    ("ix_doctors_hospital_available", lambda db: hospital_crud.get_hospital_available_doctors(1, db)),
+    ("ix_doctors_user_id", lambda db: doc_crud.get_doctor_by_user_id(db, 1)),
+    ("ix_patients_user_id", lambda db: pat_crud.get_patient_by_user_id(db, 1)),
+    ("ix_patients_hospital_card_id", lambda db: pat_crud.get_patient_by_card_id("card", db)),
+    ("ix_admins_user_id", lambda db: admin_crud.get_admin_by_user_id(db, 1)),
+    ("ix_messages_conversation", lambda db: conversation_page(db, 1, 2, 50, before=1000)),
+    ("ix_signup_links_created_at", lambda db: db.query(SignupLink).filter(SignupLink.created_at < CUTOFF).all()),
+    ("ix_password_reset_tokens_created_at",
+     lambda db: db.query(PasswordResetToken).filter(PasswordResetToken.created_at < CUTOFF).all()),
+]
+
+
+def first_statement(check) -> tuple[str, tuple]:
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    db = SessionLocal()
+    try:
+        check(db)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+        db.close()
+    return statements[0]
+
+
+def plan(statement: str, parameters) -> str:
+    postgres = engine.dialect.name == "postgresql"
+    with engine.connect() as connection:
+        if postgres:
+            connection.exec_driver_sql("SET enable_seqscan = off")
+        prefix = "EXPLAIN " if postgres else "EXPLAIN QUERY PLAN "
+        rows = connection.exec_driver_sql(prefix + statement, parameters).fetchall()
+        connection.rollback()
+    return "\n".join(" ".join(str(column) for column in row) for row in rows)
+
+
+def main() -> int:
+    failed = 0
+    strict = engine.dialect.name != "sqlite"
+    for indexes, check in CHECKS:
+        indexes = (indexes,) if isinstance(indexes, str) else indexes
+        if strict:
+            indexes = indexes[:1]
+        query_plan = plan(*first_statement(check))
+        used = next((index for index in indexes if index in query_plan), None)
+        failed += used is None
+        fallback = f" (via {used})" if used not in (None, indexes[0]) else ""
+        print(f"{'ok  ' if used else 'MISS'} {indexes[0]}{fallback}")
+        if not used:
+            print("     " + query_plan.replace("\n", "\n     "))
+    print(f"{len(CHECKS) - failed}/{len(CHECKS)} indexes used on {engine.dialect.name}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
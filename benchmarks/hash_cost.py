@@ -0,0 +1,45 @@
+"""
+Benchmark: cost of one password hash and verify per PASSWORD_HASH_ROUNDS value.
+
+    python -m benchmarks.hash_cost [--scheme bcrypt] [--rounds 4 8 10 12 13]
+
+Pick the highest cost whose verify time fits the login latency budget, divided by the
+number of logins a worker must handle at once (HASH_WORKERS verify in parallel).
+Changing PASSWORD_HASH_ROUNDS does not force resets: stored hashes are upgraded or
+downgraded on their owner's next login.
+"""
+import time
+import argparse
+import statistics
+from app.hashing import crypt_context
+
+RUNS = 5
+
+
+def timed(fn, *args) -> float:
+    times = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scheme", default="bcrypt")
+    parser.add_argument("--rounds", type=int, nargs="+", default=[4, 8, 10, 12, 13])
+    args = parser.parse_args()
+
+    print(f"{args.scheme}, median of {RUNS}")
+    print(f"{'rounds':>6} {'hash':>10} {'verify':>10} {'verifies/s/core':>16}")
+    for rounds in args.rounds:
+        context = crypt_context([args.scheme], str(rounds))
+        hashed = context.hash("Bench-password-1")
+        hash_time = timed(context.hash, "Bench-password-1")
+        verify_time = timed(context.verify, "Bench-password-1", hashed)
+        print(f"{rounds:>6} {hash_time * 1000:>7.1f} ms {verify_time * 1000:>7.1f} ms {1 / verify_time:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
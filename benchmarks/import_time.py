@@ -0,0 +1,53 @@
+"""
+Benchmark: cold import time of the app, the cost every worker, test run and Celery process pays.
+
+    python -m benchmarks.import_time [--module app.main] [--top 15] [--budget-ms 1500]
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter a few times and
+reports the fastest run, with the slowest modules by cumulative time.
+With --budget-ms it exits with 1 when the import is slower, so CI can track regressions.
+Importing must not touch the database or Redis; that happens in the lifespan.
+"""
+import re
+import sys
+import argparse
+import subprocess
+
+RUNS = 5
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def measure(module: str) -> list[tuple[int, int, str]]:
+    """ (self_us, cumulative_us, module) for every module imported """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        sys.exit(result.stderr.strip().splitlines()[-1])
+    return [(int(match[1]), int(match[2]), match[4])
+            for match in map(LINE.match, result.stderr.splitlines()) if match]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float)
+    args = parser.parse_args()
+
+    runs = [measure(args.module) for _ in range(RUNS)]
+    best = min(runs, key=lambda modules: sum(own for own, _, _ in modules))
+    total_ms = sum(own for own, _, _ in best) / 1000
+
+    print(f"import {args.module}: {total_ms:.0f} ms, {len(best)} modules (best of {RUNS})")
+    print(f"{'cumulative':>12} {'self':>9}  module")
+    for own, cumulative, name in sorted(best, key=lambda module: module[1], reverse=True)[:args.top]:
+        print(f"{cumulative / 1000:>9.1f} ms {own / 1000:>6.1f} ms  {name}")
+
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        print(f"Over budget: {total_ms:.0f} ms > {args.budget_ms:.0f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
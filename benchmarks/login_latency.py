@@ -0,0 +1,152 @@
+"""
+Benchmark: /login latency and WebSocket stalls while many logins hash passwords at once.
+
+    DATABASE_URL=postgresql://... python -m benchmarks.login_latency [--logins 200] [--concurrency 20] [--sockets 50]
+
+Starts the app under uvicorn, opens queue sockets that answer heartbeat pings every
+PING_INTERVAL, then fires concurrent logins. "ping lateness" is how much later than
+scheduled each ping arrived: anything that blocks the event loop, like bcrypt running
+on it, shows up there for every socket on the worker. The bench user is created in
+DATABASE_URL (schema from `alembic upgrade head`) and deleted afterwards.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import statistics
+import subprocess
+import httpx
+import websockets
+from app.database import session_scope
+from app.hashing import pwd_context
+from app.models import User
+from app.schemas import UserRole
+
+PING_INTERVAL = 0.1
+EMAIL = "bench-login@example.com"
+PASSWORD = "Bench-login-1"
+
+
+def seed():
+    with session_scope() as db:
+        db.query(User).filter(User.email == EMAIL).delete()
+        db.add(User(first_name="Bench", last_name="Login", email=EMAIL,
+                    password=pwd_context.hash(PASSWORD), role=UserRole.PATIENT, is_active=True))
+        db.commit()
+
+
+def cleanup():
+    with session_scope() as db:
+        db.query(User).filter(User.email == EMAIL).delete()
+        db.commit()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def wait_ready(base: str):
+    async with httpx.AsyncClient() as client:
+        for _ in range(100):
+            try:
+                await client.get(base + "/")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    sys.exit("Server did not start")
+
+
+async def socket_client(url: str, lateness: list[float], stop: asyncio.Event):
+    async with websockets.connect(url) as ws:
+        last = None
+        while not stop.is_set():
+            try:
+                message = await asyncio.wait_for(ws.recv(), timeout=0.5)
+            except asyncio.TimeoutError:
+                continue
+            if json.loads(message).get("type") != "ping":
+                continue
+            now = time.perf_counter()
+            if last is not None:
+                lateness.append(max(0.0, now - last - PING_INTERVAL))
+            last = now
+            await ws.send('{"type":"pong"}')
+
+
+async def logins(base: str, total: int, concurrency: int) -> tuple[list[float], int]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, failed = [], 0
+
+    async def login(client: httpx.AsyncClient):
+        nonlocal failed
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post(base + "/login", data={"username": EMAIL, "password": PASSWORD})
+            latencies.append(time.perf_counter() - start)
+            failed += response.status_code != 200
+
+    async with httpx.AsyncClient(timeout=120) as client:
+        await asyncio.gather(*(login(client) for _ in range(total)))
+    return latencies, failed
+
+
+async def run(args):
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = {**os.environ, "WS_PING_INTERVAL": str(PING_INTERVAL), "WS_PING_TIMEOUT": "30",
+           "QUEUE_BROADCAST_BACKEND": "memory"}
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+                               "--log-level", "warning"], env=env)
+    try:
+        await wait_ready(base)
+        lateness, stop = [], asyncio.Event()
+        sockets = [asyncio.create_task(socket_client(f"ws://127.0.0.1:{port}/ws/queue/1", lateness, stop))
+                   for _ in range(args.sockets)]
+        # Let every socket see a couple of pings before measuring
+        await asyncio.sleep(PING_INTERVAL * 3)
+        lateness.clear()
+
+        start = time.perf_counter()
+        latencies, failed = await logins(base, args.logins, args.concurrency)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await asyncio.gather(*sockets)
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"{args.logins} logins, {args.concurrency} concurrent, {args.sockets} sockets, "
+          f"{args.logins / elapsed:.1f} logins/s, {failed} failed")
+    print(f"login          p50 {percentile(latencies, 0.5) * 1000:>7.0f} ms   "
+          f"p99 {percentile(latencies, 0.99) * 1000:>7.0f} ms")
+    if lateness:
+        print(f"ping lateness  p50 {percentile(lateness, 0.5) * 1000:>7.0f} ms   "
+              f"p99 {percentile(lateness, 0.99) * 1000:>7.0f} ms   "
+              f"max {max(lateness) * 1000:.0f} ms ({len(lateness)} pings, mean {statistics.mean(lateness) * 1000:.0f} ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--sockets", type=int, default=50)
+    args = parser.parse_args()
+    seed()
+    try:
+        asyncio.run(run(args))
+    finally:
+        cleanup()
+
+
+if __name__ == "__main__":
+    main()
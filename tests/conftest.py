@@ -0,0 +1,26 @@
+import os
+import tempfile
+
+# Settings the app reads at import, pointed at a throwaway SQLite file
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("QUEUE_BROADCAST_BACKEND", "memory")
+os.environ.setdefault("DB_SCHEMA_CHECK", "off")
+
+import pytest
+from app import models  # noqa: F401, registers the tables on Base
+from app.database import Base, SessionLocal, engine
+
+
+@pytest.fixture
+def db():
+    """ A session on a freshly created schema, dropped again after the test """
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
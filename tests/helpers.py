@@ -0,0 +1,43 @@
+from contextlib import contextmanager
+from datetime import datetime
+from sqlalchemy import event
+from app import models, schemas
+from app.database import engine
+
+
+@contextmanager
+def count_queries(bind=engine):
+    """ Collects every statement sent through bind while the block runs """
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(bind, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(bind, "before_cursor_execute", capture)
+
+
+def make_hospital(db, name: str = "General") -> models.Hospital:
+    hospital = models.Hospital(
+        name=name, address="1 Main St", state="Lagos", email=f"{name.lower()}@hospital.example.com", password="x",
+        website="https://hospital.example.com", license_number="L1", phone_number="08000000000",
+        registration_number="R1", ownership_type=schemas.OwnershipType.PRIVATE, owner_name="Owner",
+    )
+    db.add(hospital)
+    db.commit()
+    return hospital
+
+
+def make_patient(db, index: int) -> models.Patient:
+    user = models.User(first_name=f"Patient{index}", last_name="Test", email=f"patient{index}@example.com",
+                       password="x", role=schemas.UserRole.PATIENT)
+    db.add(user)
+    db.flush()
+    patient = models.Patient(user_id=user.id, phone_number="0800", date_of_birth=datetime(1990, 1, 1),
+                             gender="female", country="NG", state_of_residence="Lagos", home_address="2 Side St")
+    db.add(patient)
+    db.flush()
+    return patient
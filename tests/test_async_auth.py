@@ -0,0 +1,37 @@
+import os
+import asyncio
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from app import models, schemas
+from app.database import to_async_url
+from app.hashing import pwd_context
+from app.oauth2 import authenticate_user_async, create_access_token, get_current_user_async
+from app.principal_cache import principal_cache
+
+
+def test_login_and_current_user_on_the_async_engine(db):
+    user = models.User(first_name="Async", last_name="User", email="async@example.com",
+                       password=pwd_context.hash("Async-pass-1"), role=schemas.UserRole.PATIENT)
+    db.add(user)
+    db.commit()
+    user_id = user.id
+    token = create_access_token({"sub": user.email, "user_id": user_id, "kind": "user",
+                                 "user_role": schemas.UserRole.PATIENT})
+    principal_cache.clear()
+
+    async def run():
+        bind = create_async_engine(to_async_url(os.environ["DATABASE_URL"]))
+        try:
+            async with async_sessionmaker(bind, expire_on_commit=False)() as session:
+                assert await authenticate_user_async(session, "async@example.com", "wrong") is False
+                authenticated = await authenticate_user_async(session, "async@example.com", "Async-pass-1")
+                assert authenticated.id == user_id
+
+                loaded = await get_current_user_async(session, token)
+                # Second call is a cache hit, merged into the same session
+                cached = await get_current_user_async(session, token)
+                assert loaded is cached is authenticated
+        finally:
+            await bind.dispose()
+            principal_cache.clear()
+
+    asyncio.run(run())
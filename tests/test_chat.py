@@ -0,0 +1,23 @@
+from fastapi.testclient import TestClient
+from app import main
+
+
+def test_chat_frames_are_json_and_echoed_to_the_sender(db, monkeypatch):
+    monkeypatch.setattr(main.send_notification, "delay", lambda *args: None)
+
+    with TestClient(main.app) as client:
+        with client.websocket_connect("/chat/1/2") as sender, client.websocket_connect("/chat/2/1") as receiver, \
+                client.websocket_connect("/chat/3/1") as bystander:
+            sender.send_text("hello")
+            echoed = sender.receive_json()
+            delivered = receiver.receive_json()
+
+            assert echoed == delivered
+            assert echoed["type"] == "message"
+            assert (echoed["sender_id"], echoed["receiver_id"], echoed["message_text"]) == (1, 2, "hello")
+            assert echoed["id"] and echoed["timestamp"]
+
+            bystander.send_text("ping user 1")
+            # User 3 writing to user 1: echoed to user 3 and delivered to user 1
+            assert bystander.receive_json()["sender_id"] == 3
+            assert sender.receive_json()["message_text"] == "ping user 1"
@@ -0,0 +1,50 @@
+import time
+import asyncio
+from datetime import datetime
+from app import message_sink as sink_module
+from app.message_sink import MessageSink
+
+
+def test_group_commit(monkeypatch):
+    batches = []
+
+    def insert_messages(rows):
+        batches.append(len(rows))
+        time.sleep(0.05)
+        return list(range(len(rows)))
+
+    monkeypatch.setattr(sink_module, "insert_messages", insert_messages)
+
+    async def run():
+        sink = MessageSink(flush_size=4, interval_ms=0)
+        first = asyncio.create_task(sink.save(1, 2, "first"))
+        await asyncio.sleep(0.01)
+        # Arrive while the first write runs: batched, at most flush_size per write
+        rest = [asyncio.create_task(sink.save(1, 2, f"m{i}")) for i in range(6)]
+        results = await asyncio.gather(first, *rest)
+        await sink.drain()
+        return results
+
+    start = time.perf_counter()
+    results = asyncio.run(run())
+
+    # The idle sink wrote the first message straight away, without waiting for a batch
+    assert batches == [1, 4, 2]
+    assert [result["message_text"] for result in results] == ["first"] + [f"m{i}" for i in range(6)]
+    assert time.perf_counter() - start < 0.5
+
+
+def test_conversation_upsert_rows_are_in_key_order(db, monkeypatch):
+    statements = []
+    monkeypatch.setattr(db, "execute", statements.append)
+    now = datetime.now()
+    rows = [{"sender_id": 9, "receiver_id": 2, "message_text": "a", "timestamp": now},
+            {"sender_id": 2, "receiver_id": 9, "message_text": "b", "timestamp": now},
+            {"sender_id": 5, "receiver_id": 1, "message_text": "c", "timestamp": now}]
+
+    sink_module.update_conversations(db, rows, [1, 2, 3])
+
+    params = statements[0].compile().params
+    keys = [(params[f"user_id_m{i}"], params[f"other_user_id_m{i}"]) for i in range(4)]
+    # Every batch locks the pairs in the same order
+    assert keys == [(1, 5), (2, 9), (5, 1), (9, 2)]
@@ -0,0 +1,93 @@
+import pytest
+from fastapi import HTTPException
+from app import models, schemas
+from app.oauth2 import create_access_token, get_current_user
+from app.principal_cache import PrincipalCache, principal_cache
+from tests.helpers import make_hospital
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    principal_cache.clear()
+    yield
+    principal_cache.clear()
+
+
+@pytest.fixture
+def shared_email(db):
+    """ A hospital and a user with the same email and the same primary key """
+    hospital = make_hospital(db, "Shared")
+    user = models.User(id=hospital.id, first_name="Shared", last_name="User", email=hospital.email,
+                       password="x", role=schemas.UserRole.PATIENT)
+    db.add(user)
+    db.commit()
+    return hospital, user
+
+
+def token(principal, kind: str) -> str:
+    return create_access_token({"sub": principal.email, "user_id": principal.id, "kind": kind,
+                                "user_role": schemas.UserRole.PATIENT})
+
+
+def test_cache_hit_keeps_the_token_kind(db, shared_email):
+    hospital, user = shared_email
+
+    assert isinstance(get_current_user(db, token(hospital, "hospital")), models.Hospital)
+    # Served from the cache the second time, still the kind the token names
+    assert isinstance(get_current_user(db, token(hospital, "hospital")), models.Hospital)
+    assert isinstance(get_current_user(db, token(user, "user")), models.User)
+    assert isinstance(get_current_user(db, token(user, "user")), models.User)
+
+
+def test_invalidate_forgets_every_kind(db, shared_email):
+    hospital, user = shared_email
+    get_current_user(db, token(hospital, "hospital"))
+    get_current_user(db, token(user, "user"))
+
+    principal_cache.invalidate(user.email, user.id)
+
+    assert not principal_cache.entries
+
+
+def test_token_for_a_missing_principal_is_rejected(db, shared_email):
+    hospital, _ = shared_email
+    stale = token(hospital, "hospital")
+    db.delete(hospital)
+    db.commit()
+
+    with pytest.raises(HTTPException):
+        get_current_user(db, stale)
+
+
+class FakeRedis:
+    """ The get/set/delete subset of redis.Redis the cache uses, shared like one server """
+
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, px=None):
+        self.values[key] = value
+
+    def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+
+
+def test_invalidate_reaches_every_worker_with_redis(db, shared_email):
+    _, user = shared_email
+    server = FakeRedis()
+    workers = [PrincipalCache(redis_url=None), PrincipalCache(redis_url=None)]
+    for worker in workers:
+        worker.redis = server
+
+    workers[0].set("user", user.email, user.id, user)
+    assert isinstance(workers[1].get(db, "user", user.email, user.id), models.User)
+
+    workers[0].invalidate(user.email, user.id)
+
+    # No worker kept a copy of its own to serve after the invalidation
+    assert workers[1].get(db, "user", user.email, user.id) is None
+    assert not workers[0].entries and not workers[1].entries
@@ -0,0 +1,111 @@
+import asyncio
+from app.queue_cache import QueueSnapshotCache
+from app.websocket_manager import encode_frame
+
+TIME = "2030-01-01T09:00:00"
+
+
+def row(appointment_id: int, status: str = "pending") -> dict:
+    return {"id": appointment_id, "patient": "P", "patient_id": 1, "time": TIME, "status": status}
+
+
+def diff(seq: int, *changes) -> str:
+    return encode_frame({"type": "queue_diff", "seq": seq, "changes": list(changes)})
+
+
+def loader(seq: int, rows: list[dict], calls: list, gate: asyncio.Event = None):
+    async def load():
+        calls.append(seq)
+        if gate is not None:
+            await gate.wait()
+        return seq, [dict(r) for r in rows]
+    return load
+
+
+def ids(rows: list[dict]) -> list[int]:
+    return [r["id"] for r in rows]
+
+
+def test_concurrent_misses_share_one_load():
+    async def run():
+        cache, calls, gate = QueueSnapshotCache(), [], asyncio.Event()
+        load = loader(5, [row(1), row(2)], calls, gate)
+        waiters = [asyncio.create_task(cache.get(1, load)) for _ in range(10)]
+        await asyncio.sleep(0)
+        gate.set()
+        results = await asyncio.gather(*waiters)
+        # Served from memory afterwards
+        again = await cache.get(1, load)
+        return calls, results, again
+
+    calls, results, again = asyncio.run(run())
+    assert calls == [5]
+    assert all(seq == 5 and ids(rows) == [1, 2] for seq, rows in results)
+    assert again[0] == 5 and ids(again[1]) == [1, 2]
+
+
+def test_events_during_a_load_are_applied_after_it():
+    async def run():
+        cache, calls, gate = QueueSnapshotCache(), [], asyncio.Event()
+        pending = asyncio.create_task(cache.get(1, loader(5, [row(1)], calls, gate)))
+        await asyncio.sleep(0)
+        # Already part of the loaded rows, then one the load missed
+        cache.apply(1, diff(5, {"op": "removed", "data": {"id": 1}}))
+        cache.apply(1, diff(6, {"op": "added", "data": row(2)}))
+        gate.set()
+        return await pending
+
+    seq, rows = asyncio.run(run())
+    assert seq == 6
+    assert ids(rows) == [1, 2]
+
+
+def test_a_sequence_gap_discards_the_snapshot():
+    async def run():
+        cache, calls = QueueSnapshotCache(), []
+        await cache.get(1, loader(5, [row(1)], calls))
+        cache.apply(1, diff(6, {"op": "updated", "data": row(1, "in_progress")}))
+        patched = await cache.get(1, loader(0, [], calls))
+        # seq 7 never arrived
+        cache.apply(1, diff(8, {"op": "added", "data": row(2)}))
+        assert cache.peek(1) is None
+        reloaded = await cache.get(1, loader(8, [row(1), row(2)], calls))
+        return calls, patched, reloaded
+
+    calls, patched, reloaded = asyncio.run(run())
+    assert patched[0] == 6 and patched[1][0]["status"] == "in_progress"
+    assert calls == [5, 8]
+    assert reloaded[0] == 8 and ids(reloaded[1]) == [1, 2]
+
+
+def test_a_discard_during_the_load_is_not_overwritten():
+    async def run():
+        cache, calls, gate = QueueSnapshotCache(), [], asyncio.Event()
+        pending = asyncio.create_task(cache.get(1, loader(5, [row(1)], calls, gate)))
+        await asyncio.sleep(0)
+        cache.discard(1)
+        gate.set()
+        result = await pending
+        return calls, result, cache.peek(1)
+
+    calls, result, cached = asyncio.run(run())
+    # The waiter falls back to a load of its own, nothing stale is cached
+    assert calls == [5, 5]
+    assert result[0] == 5 and ids(result[1]) == [1]
+    assert cached is None
+
+
+def test_a_cancelled_waiter_does_not_cancel_the_load():
+    async def run():
+        cache, calls, gate = QueueSnapshotCache(), [], asyncio.Event()
+        load = loader(5, [row(1)], calls, gate)
+        first = asyncio.create_task(cache.get(1, load))
+        second = asyncio.create_task(cache.get(1, load))
+        await asyncio.sleep(0)
+        first.cancel()
+        gate.set()
+        return calls, await second
+
+    calls, (seq, rows) = asyncio.run(run())
+    assert calls == [5]
+    assert seq == 5 and ids(rows) == [1]
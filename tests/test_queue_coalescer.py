@@ -0,0 +1,81 @@
+import asyncio
+from app.queue_coalescer import QueueUpdateCoalescer, QUEUE_ADDED, QUEUE_REMOVED, QUEUE_UPDATED
+
+
+def recorder(flushes: list, delay: float = 0):
+    async def flush(hospital_id: int, changes: dict[int, str]):
+        if delay:
+            await asyncio.sleep(delay)
+        flushes.append((hospital_id, dict(changes)))
+    return flush
+
+
+def test_a_burst_is_flushed_once():
+    flushes = []
+
+    async def run():
+        coalescer = QueueUpdateCoalescer(recorder(flushes), window_ms=30, max_delay_ms=1000)
+        coalescer.schedule(1, 10, QUEUE_ADDED)
+        coalescer.schedule(1, 10, QUEUE_UPDATED)
+        coalescer.schedule(1, 11, QUEUE_UPDATED)
+        coalescer.schedule(1, 11, QUEUE_REMOVED)
+        coalescer.schedule(2, 20, QUEUE_UPDATED)
+        await asyncio.sleep(0.1)
+
+    asyncio.run(run())
+    # An add followed by updates is still an add, the last op wins otherwise
+    assert sorted(flushes) == [(1, {10: QUEUE_ADDED, 11: QUEUE_REMOVED}), (2, {20: QUEUE_UPDATED})]
+
+
+def test_add_then_remove_sends_nothing():
+    flushes = []
+
+    async def run():
+        coalescer = QueueUpdateCoalescer(recorder(flushes), window_ms=30, max_delay_ms=1000)
+        coalescer.schedule(1, 10, QUEUE_ADDED)
+        coalescer.schedule(1, 10, QUEUE_UPDATED)
+        coalescer.schedule(1, 10, QUEUE_REMOVED)
+        await asyncio.sleep(0.1)
+        return coalescer
+
+    coalescer = asyncio.run(run())
+    assert flushes == []
+    assert not coalescer.pending and not coalescer.timers
+
+
+def test_max_delay_caps_a_long_burst():
+    flushes = []
+
+    async def run():
+        coalescer = QueueUpdateCoalescer(recorder(flushes), window_ms=50, max_delay_ms=100)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        # A change every 20 ms never leaves the window quiet
+        for appointment_id in range(15):
+            coalescer.schedule(1, appointment_id, QUEUE_UPDATED)
+            await asyncio.sleep(0.02)
+        await coalescer.drain()
+        return loop.time() - start
+
+    elapsed = asyncio.run(run())
+    assert len(flushes) >= 2
+    assert elapsed < 0.5
+    assert sorted(appointment_id for _, changes in flushes for appointment_id in changes) == list(range(15))
+
+
+def test_drain_flushes_pending_and_waits_for_flushes_in_flight():
+    flushes = []
+
+    async def run():
+        coalescer = QueueUpdateCoalescer(recorder(flushes, delay=0.05), window_ms=10, max_delay_ms=1000)
+        coalescer.schedule(1, 10, QUEUE_UPDATED)
+        # Hospital 1's timer is now inside the slow flush
+        await asyncio.sleep(0.03)
+        assert coalescer.flushing
+        coalescer.schedule(2, 20, QUEUE_UPDATED)
+        await coalescer.drain()
+        return coalescer
+
+    coalescer = asyncio.run(run())
+    assert sorted(flushes) == [(1, {10: QUEUE_UPDATED}), (2, {20: QUEUE_UPDATED})]
+    assert not coalescer.pending and not coalescer.timers and not coalescer.flushing
@@ -0,0 +1,31 @@
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from app.main import app
+from app.routers import queue_sys
+
+
+def test_failed_subscribe_leaves_no_connection(db, monkeypatch):
+    created = []
+
+    async def subscribe(hospital_id: int):
+        raise ConnectionError("broker down")
+
+    def client_connection(*args, **kwargs):
+        created.append(args)
+        return original(*args, **kwargs)
+
+    original = queue_sys.ClientConnection
+    monkeypatch.setattr(queue_sys.manager.backend, "subscribe", subscribe)
+    monkeypatch.setattr(queue_sys, "ClientConnection", client_connection)
+
+    client = TestClient(app)
+    # The socket is closed first, then the subscribe error reaches the server
+    with pytest.raises(ConnectionError):
+        with client.websocket_connect("/ws/queue/1") as websocket:
+            with pytest.raises(WebSocketDisconnect) as closed:
+                websocket.receive_json()
+
+    assert closed.value.code == 1011
+    assert created == []
+    assert queue_sys.manager.connections() == []
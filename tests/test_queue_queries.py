@@ -0,0 +1,30 @@
+from datetime import datetime, timedelta
+import pytest
+from app import models, schemas
+from app.routers.queue_sys import get_queue_data
+from tests.helpers import count_queries, make_hospital, make_patient
+
+
+def seed_queue(db, hospital: models.Hospital, size: int):
+    now = datetime.now()
+    for i in range(size):
+        patient = make_patient(db, i)
+        db.add(models.Appointment(patient_id=patient.id, hospital_id=hospital.id, appointment_note="checkup",
+                                  scheduled_time=now + timedelta(minutes=i), status=schemas.AppointmentStatus.PENDING))
+    db.commit()
+
+
+@pytest.mark.parametrize("size", [1, 20, 200])
+def test_queue_loads_in_one_query(db, size):
+    hospital = make_hospital(db)
+    seed_queue(db, hospital, size)
+    hospital_id = hospital.id
+    db.expire_all()
+
+    with count_queries() as statements:
+        queue = get_queue_data(db, hospital_id)
+
+    assert len(queue) == size
+    assert queue[0]["patient"] == "Patient0 Test"
+    # One joined SELECT however long the queue is, no lazy loads per row
+    assert len(statements) == 1
@@ -0,0 +1,68 @@
+import asyncio
+from datetime import datetime, timedelta
+from app import models, schemas
+from app.routers import queue_sys
+from tests.helpers import make_hospital, make_patient
+
+
+def test_sweep_publishes_window_drift(db, monkeypatch):
+    start = datetime(2030, 1, 1, 9, 0)
+    clock = [start]
+
+    class Clock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return clock[0]
+
+    monkeypatch.setattr(queue_sys, "datetime", Clock)
+
+    hospital = make_hospital(db)
+    patient = make_patient(db, 0)
+    # Beyond the 24 hour lookahead when the first snapshot is taken
+    appointment = models.Appointment(patient_id=patient.id, hospital_id=hospital.id, appointment_note="checkup",
+                                     scheduled_time=start + timedelta(hours=30), status=schemas.AppointmentStatus.PENDING)
+    db.add(appointment)
+    db.commit()
+    hospital_id, appointment_id = hospital.id, appointment.id
+
+    published = []
+    publish = queue_sys.manager.publish
+
+    async def record(hospital_id: int, message: dict):
+        published.append(message)
+        await publish(hospital_id, message)
+
+    monkeypatch.setattr(queue_sys.manager, "publish", record)
+
+    async def run():
+        await queue_sys.manager.backend.subscribe(hospital_id)
+        try:
+            _, rows = await queue_sys.load_snapshot(hospital_id)
+            assert rows == []
+
+            # Nothing moved, nothing is sent
+            await queue_sys.sweep_queue_window(hospital_id)
+            assert published == []
+
+            # The appointment enters the window
+            clock[0] = start + timedelta(hours=10)
+            await queue_sys.sweep_queue_window(hospital_id)
+            _, rows = await queue_sys.load_snapshot(hospital_id)
+            assert [row["id"] for row in rows] == [appointment_id]
+
+            # And falls out past the lookback
+            clock[0] = start + timedelta(hours=50)
+            await queue_sys.sweep_queue_window(hospital_id)
+            _, rows = await queue_sys.load_snapshot(hospital_id)
+            assert rows == []
+        finally:
+            await queue_sys.manager.backend.unsubscribe(hospital_id)
+            queue_sys.manager.snapshots.discard(hospital_id)
+
+    asyncio.run(run())
+
+    assert [message["type"] for message in published] == ["queue_diff", "queue_diff"]
+    assert published[1]["seq"] == published[0]["seq"] + 1
+    assert [change["op"] for change in published[0]["changes"]] == ["added"]
+    assert published[0]["changes"][0]["data"]["id"] == appointment_id
+    assert published[1]["changes"] == [{"op": "removed", "data": {"id": appointment_id}}]
@@ -0,0 +1,48 @@
+import itertools
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from app import database
+from app.database import Base
+from app.main import app
+from tests.helpers import make_hospital
+
+
+@pytest.fixture
+def replicas(db, tmp_path, monkeypatch):
+    """ Two SQLite files standing in for read replicas, each holding a hospital named after it """
+    engines = []
+    for name in ("Replica1", "Replica2"):
+        replica = create_engine(f"sqlite:///{tmp_path / name}.db")
+        Base.metadata.create_all(bind=replica)
+        with Session(replica) as session:
+            make_hospital(session, name)
+        engines.append(replica)
+    monkeypatch.setattr(database, "_next_replica", itertools.cycle(engines))
+    yield engines
+    for replica in engines:
+        replica.dispose()
+
+
+def hospital_names(client: TestClient, path: str) -> list[str]:
+    response = client.get(path)
+    assert response.status_code == 200
+    body = response.json()
+    return [hospital["name"] for hospital in (body if isinstance(body, list) else [body])]
+
+
+def test_list_endpoints_alternate_between_replicas(db, replicas):
+    make_hospital(db, "Primary")
+    client = TestClient(app)
+
+    served = [hospital_names(client, "/hospitals") for _ in range(4)]
+
+    assert served == [["Replica1"], ["Replica2"], ["Replica1"], ["Replica2"]]
+
+
+def test_single_hospital_reads_the_primary(db, replicas):
+    hospital = make_hospital(db, "Primary")
+    client = TestClient(app)
+
+    assert hospital_names(client, f"/hospitals/{hospital.id}") == ["Primary"]
@@ -0,0 +1,22 @@
+import pytest
+from sqlalchemy import create_engine, exc, text
+from app.sql_metrics import RequestStats, current_stats, instrument
+
+
+def test_failed_statements_leave_no_start_times():
+    bind = create_engine("sqlite://")
+    instrument(bind)
+    stats = RequestStats()
+    token = current_stats.set(stats)
+    try:
+        with bind.connect() as connection:
+            for _ in range(5):
+                with pytest.raises(exc.OperationalError):
+                    connection.execute(text("SELECT * FROM missing_table"))
+            connection.execute(text("SELECT 1"))
+            assert connection.info["query_start"] == []
+    finally:
+        current_stats.reset(token)
+
+    # Only the statement that ran is counted
+    assert stats.count == 1